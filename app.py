@@ -1,17 +1,155 @@
 import streamlit as st
-import google.generativeai as genai
-import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from streamlit.errors import StreamlitAPIException
+import tracing
+from tracing import span, traced, count
+from model_ranking import FallbackModel, ranked_models, ranking_stamp
 from datetime import datetime, date
 import json
-import plotly.express as px
+import os
+import sqlite3
 import time
 import io
+import re
+import hashlib
+import importlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import wraps
 
 # --- 1. SETUP HALAMAN ---
+RUN_T0 = time.perf_counter()
 st.set_page_config(page_title="My Life OS 12.0 (Archive Master)", layout="wide", page_icon="🧬")
 
+# --- 2. KONEKSI DATABASE & AI ---
+# Didefinisikan sebelum login supaya bisa dipanaskan di latar selama user mengetik password.
+# Modul berat (pandas, gspread, genai, plotly) hanya diimpor di dalam fungsi / setelah login.
+@st.cache_resource
+def get_sheets_gateway():
+    """Rate limiter + retry + penggabung baca untuk semua sesi di proses ini (lihat sheets_client.py)."""
+    from sheets_client import SheetsGateway
+    return SheetsGateway()
+
+def gcp_secret():
+    """Service account sebagai string JSON (bisa di-hash untuk cache_resource)."""
+    raw = st.secrets["GCP_SERVICE_ACCOUNT"]
+    return raw if isinstance(raw, str) else json.dumps(dict(raw))
+
+@st.cache_resource
+def init_connection(creds_raw):
+    """Gagal -> exception (tidak di-cache), supaya koneksi dicoba lagi setelah jaringan pulih."""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    from schema import SCHEMAS, header_for
+    from sheets_client import GuardedSpreadsheet, GuardedWorksheet
+
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds_info = json.loads(creds_raw)
+    
+    if "private_key" in creds_info:
+        creds_info["private_key"] = creds_info["private_key"].replace("\\n", "\n")
+    
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_info, scope)
+    client = gspread.authorize(creds)
+    gw = get_sheets_gateway()
+    sh = GuardedSpreadsheet(gw.read("open", client.open, "productivity_db"), gw)
+    
+    # Satu request metadata untuk semua tab (bukan sh.worksheet() berulang)
+    by_title = {ws.title: GuardedWorksheet(ws, gw) for ws in sh.worksheets()}
+
+    # Cek/Buat Tab Advisor & Focus jika belum ada
+    for key in ("advisor", "focus"):
+        title = SCHEMAS[key]["title"]
+        if title not in by_title:
+            by_title[title] = GuardedWorksheet(sh.add_worksheet(title, rows=1000, cols=len(header_for(key))), gw)
+            by_title[title].append_row(header_for(key))
+
+    return {key: by_title[spec["title"]] for key, spec in SCHEMAS.items()}
+
+CONNECT_RETRY_EVERY = 30  # detik antar percobaan koneksi saat offline
+
+@st.cache_resource
+def get_conn_state():
+    return {"failed_at": 0, "error": None}
+
+def connect():
+    """Sheets atau None (offline). App tetap jalan dari mirror lokal; koneksi dicoba ulang berkala."""
+    state = get_conn_state()
+    if time.time() - state["failed_at"] < CONNECT_RETRY_EVERY: return None
+    try:
+        conn = init_connection(gcp_secret()); state["error"] = None
+        return conn
+    except Exception as e:
+        state.update(failed_at=time.time(), error=str(e))
+        return None
+
+SAFE_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+def gemini_secret():
+    try: return st.secrets.get("GEMINI_API_KEY")
+    except Exception: return None  # tidak ada secrets.toml
+
+DEFAULT_MODEL = 'models/gemini-2.5-flash'
+MODEL_CHAIN = 3  # model utama + cadangan saat rate limit, dari ranking cek_model.py
+
+@st.cache_resource
+def get_model(api_key, ranking):
+    """`ranking`: mtime file ranking, supaya hasil cek_model.py yang baru langsung dipakai."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    names = ranked_models()[:MODEL_CHAIN] or [DEFAULT_MODEL]
+    return FallbackModel([(n, genai.GenerativeModel(n, safety_settings=SAFE_SETTINGS)) for n in names])
+
+def load_model():
+    """Model Gemini, atau None kalau API key tidak ada / setup gagal (fitur AI disembunyikan)."""
+    key = gemini_secret()
+    if not key: return None
+    try: return get_model(key, ranking_stamp())
+    except Exception: return None
+
+# --- WARM-UP (selama layar login) ---
+WARM_MODULES = ("pandas", "gspread", "schema", "sheets_client", "mirror", "search_index")  # plotly & xlsxwriter tetap menunggu tab-nya
+
+@st.cache_resource
+def start_warmup(creds_raw, api_key):
+    """Sekali per proses: impor modul berat, buka Sheets & siapkan Gemini di thread latar.
+    Secrets dibaca di thread utama lalu dioper, karena st.secrets milik run yang sedang jalan."""
+    state = {"ms": {}, "error": None, "done": threading.Event()}
+    def step(name, fn):
+        t0 = time.perf_counter()
+        try: fn()
+        except Exception as e: state["error"] = f"{name}: {e}"
+        finally: state["ms"][name] = (time.perf_counter() - t0) * 1000
+    def run():
+        step("import", lambda: [importlib.import_module(m) for m in WARM_MODULES])
+        if creds_raw: step("sheets", lambda: init_connection(creds_raw))
+        if api_key: step("gemini", lambda: get_model(api_key, ranking_stamp()))
+        state["done"].set()
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+    return state
+
+def warmup():
+    try: creds = gcp_secret()
+    except Exception: creds = None
+    return start_warmup(creds, gemini_secret())
+
+class LazyModule:
+    """Modul yang baru diimpor saat atributnya pertama dipakai (mis. px.bar di tab yang dibuka)."""
+    def __init__(self, name): self._name = name
+    def __getattr__(self, attr): return getattr(importlib.import_module(self._name), attr)
+
+px = LazyModule("plotly.express")
+
+def startup_metrics():
+    return st.session_state.setdefault("startup", {})
+
+warmup()
+
 # ==========================================
 # 🔒 SISTEM KEAMANAN (LOGIN)
 # ==========================================
@@ -30,184 +168,884 @@ def check_password():
         if st.button("Buka Gembok 🔓"):
             if pwd == st.secrets["APP_PASSWORD"]:
                 st.session_state["password_correct"] = True
+                st.session_state["login_at"] = time.perf_counter()  # -> dashboard_ms di akhir run berikutnya
                 st.rerun()
             else:
                 st.error("⛔ Password Salah! Akses ditolak.")
+    startup_metrics().setdefault("first_paint_ms", (time.perf_counter() - RUN_T0) * 1000)
     return False
 
 if not check_password(): st.stop()
 
+# Import berat baru setelah login (biasanya sudah dipanaskan oleh warm-up)
+import pandas as pd
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from schema import SCHEMAS, ID_COL, header_for, parse_frame, concat_frames
+from mirror import Mirror
+from search_index import SearchIndex
+
+# --- TRACE PER RUN (lihat tracing.py; panel di tab Database) ---
+TRACE_HISTORY = 20                      # trace terakhir yang disimpan per sesi
+TRACE_LOG = os.environ.get("TRACE_LOG")  # opsional: path file JSONL, satu baris per run
+
+def keep_trace(t):
+    if not t: return
+    hist = st.session_state.setdefault("traces", [])
+    hist.append(t); del hist[:-TRACE_HISTORY]
+    if TRACE_LOG:
+        with open(TRACE_LOG, "a", encoding="utf-8") as f: f.write(t.to_json() + "\n")
+
+if "trace_open" in st.session_state: keep_trace(st.session_state.pop("trace_open").finish(interrupted=True))
+st.session_state["trace_open"] = tracing.start("run")
+
 # ==========================================
 # 🚀 APLIKASI UTAMA
 # ==========================================
+sheets = connect()
+
+# --- 3. DATA LOADING (Delta Sync) ---
+SHEET_KEYS = list(SCHEMAS)
+SYNC_TTL = 60            # detik sebelum cek baris baru ke Google
+FULL_RESYNC_EVERY = 600  # detik, reload penuh berkala untuk menangkap edit manual di Sheets
+
+MIRROR_PATH = "productivity_db.sqlite3"  # mirror lokal (lihat mirror.py), di-.gitignore
 
-# --- 2. KONEKSI DATABASE ---
 @st.cache_resource
-def init_connection():
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        raw = st.secrets["GCP_SERVICE_ACCOUNT"]
-        if isinstance(raw, str): creds_info = json.loads(raw)
-        else: creds_info = dict(raw)
-        
-        if "private_key" in creds_info:
-            creds_info["private_key"] = creds_info["private_key"].replace("\\n", "\n")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_info, scope)
-        client = gspread.authorize(creds)
-        sh = client.open("productivity_db")
-        
-        # Cek/Buat Tab Advisor jika belum ada
-        try: ws_adv = sh.worksheet("advisor")
-        except: ws_adv = sh.add_worksheet("advisor", rows=1000, cols=3); ws_adv.append_row(["Timestamp", "Pertanyaan", "Jawaban"])
-
-        return {
-            "todo": sh.worksheet("todos"),
-            "fin": sh.worksheet("finance"),
-            "habit": sh.worksheet("habits"),
-            "journal": sh.worksheet("journal"),
-            "advisor": ws_adv
-        }
-    except Exception as e:
-        st.error(f"❌ Error Database: {e}")
-        return None
+def get_mirror():
+    try: return Mirror(MIRROR_PATH, ID_COL)
+    except sqlite3.Error: return Mirror(":memory:", ID_COL)  # disk read-only -> mirror hanya bertahan selama proses
+
+@st.cache_resource
+def get_sync_store():
+    """Salinan lokal tiap sheet, dipakai bersama oleh semua sesi; diisi awal dari mirror di disk."""
+    tables = {}
+    for k in SHEET_KEYS:
+        saved = get_mirror().load(k)
+        # synced_at=0 -> reconciler latar langsung cek delta, run pertama tidak menunggu jaringan
+        if saved: tables[k] = {**saved, "version": 1, "synced_at": 0, "stale": False}
+    return {"lock": threading.Lock(), "tables": tables, "sheets": None}
+
+if sheets: get_sync_store()["sheets"] = sheets
+
+def _sheet(key):
+    return get_sync_store()["sheets"][key]
+
+def _trim(row):
+    row = list(row)
+    while row and row[-1] == "": row.pop()
+    return row
+
+def _fit(row, width):
+    row = list(row)[:width]
+    return row + [""] * (width - len(row))
+
+def _touch(tbl, start):
+    """Baris ke-`start` dst. berubah: naikkan versi, frame bertipe cukup di-parse ulang dari situ."""
+    tbl["dirty_from"] = min(tbl.get("dirty_from", start), start)
+    tbl["version"] += 1
+
+def _persist(key, tbl, start):
+    """Tulis baris ke-`start` dst. ke mirror SQLite; dipanggil di dalam store["lock"] yang sama dengan perubahannya."""
+    if tbl["header"]: get_mirror().save(key, tbl["header"], tbl["rows"], start, tbl["full_at"])
+
+def _prepare(values):
+    """Nilai mentah batchGet -> (header, baris selebar header). Dikerjakan di luar store["lock"]."""
+    header = _trim(values[0]) if values else []
+    return header, [_fit(r, len(header)) for r in values[1:]]
+
+def _load_values(tbl, header, rows):
+    """
+    Reload penuh; versi hanya naik kalau isinya berbeda, dan hanya dari baris pertama yang berubah.
+    Mengembalikan posisi baris pertama yang berubah, atau None kalau tidak ada perubahan.
+    """
+    tbl["full_at"] = time.time()
+    old = tbl["rows"] if header == tbl["header"] else []
+    same = next((i for i, (a, b) in enumerate(zip(old, rows)) if a != b), min(len(old), len(rows)))
+    if same == len(old) == len(rows) and tbl["header"] is not None: return
+    tbl.update(header=header, rows=rows)
+    _touch(tbl, same)
+    return same
+
+def _reload(key, tbl, loaded):
+    start = _load_values(tbl, *loaded)
+    if start is not None: _persist(key, tbl, start)
+
+def _apply_delta(tbl, head_vals, tail_vals):
+    """
+    Tambahkan baris baru hasil delta. Baris terakhir yang sudah diketahui ikut diambil ulang
+    sebagai jangkar: kalau isinya berubah (ada baris dihapus/bergeser) atau header berubah,
+    kembalikan False agar sheet itu di-reload penuh.
+    """
+    header, rows = tbl["header"], tbl["rows"]
+    anchor = header if not rows else rows[-1]
+    got_header = _trim(head_vals[0]) if head_vals else []
+    got_anchor = _fit(tail_vals[0], len(header)) if tail_vals else None
+    if got_header != header or got_anchor != _fit(anchor, len(header)): return False
+    new_rows = [_fit(r, len(header)) for r in tail_vals[1:]]
+    if new_rows:
+        _touch(tbl, len(rows)); rows.extend(new_rows)
+    return len(new_rows)
+
+def new_id():
+    return uuid.uuid4().hex[:10]
+
+def _assign_ids(tbl):
+    """
+    Beri ID ke baris yang belum punya (data lama / input manual di Sheets); header tanpa kolom ID
+    juga ditambahkan. Mengembalikan (baris pertama yang berubah, range, nilai) untuk ditulis balik
+    sebagai satu blok kolom, atau None kalau semua baris sudah ber-ID. Penulisan ke Sheets dikerjakan pemanggil di luar kunci.
+    """
+    header, rows = tbl["header"], tbl["rows"]
+    if not header: return None
+    had_col = ID_COL in header
+    if not had_col:
+        header.append(ID_COL)
+        for r in rows: r.append("")
+    c = header.index(ID_COL)
+    missing = [i for i, r in enumerate(rows) if not r[c]]
+    if had_col and not missing: return None
+    for i in missing:  # turunan posisi + isi: tulis ID yang gagal menghasilkan ID yang sama saat diulang
+        rows[i][c] = hashlib.sha1(json.dumps([i, rows[i]]).encode("utf-8")).hexdigest()[:10]
+    start = missing[0] if had_col else -1  # -1 = mulai dari sel header
+    col = rowcol_to_a1(1, c + 1).rstrip("0123456789")
+    block = [[ID_COL if i < 0 else rows[i][c]] for i in range(start, len(rows))]
+    _touch(tbl, max(start, 0))
+    return max(start, 0), f"{col}{start + 2}:{col}{len(rows) + 1}", block
 
-sheets = init_connection()
+def _batch_fetch(ranges):
+    """Semua range (lintas tab) diambil dalam SATU request values:batchGet."""
+    if not ranges: return []
+    resp = _sheet("todo").spreadsheet.values_batch_get(ranges)
+    return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
 
-# --- 3. DATA LOADING (Cache) ---
-@st.cache_data(ttl=60)
+@traced(cat="data")
+def sync_all(keys=SHEET_KEYS):
+    """
+    Sinkronkan semua tab yang sudah lewat TTL/stale dalam satu putaran jaringan.
+    Tab baru/kedaluwarsa diambil penuh, sisanya delta; jangkar yang meleset memicu
+    satu putaran kedua khusus reload penuh.
+    store["lock"] hanya dipegang saat merencanakan dan saat menerapkan hasil, tidak selama request
+    (batchGet, backoff gateway, tulis ID), supaya sesi lain tetap membaca salinan lokal. Tab yang
+    berubah lokal selama request (versinya bergeser) dilewati dan diambil lagi putaran berikutnya.
+    """
+    store = get_sync_store()
+    with store["lock"]: seen = {k: t["version"] for k, t in store["tables"].items()}
+    # Salinan lokal lebih baru dari Sheets sampai antrean di-flush. Dibaca di luar store["lock"]
+    # (urutan kunci, lihat 3b); perubahan lokal sesudah snapshot di atas terlihat dari versinya.
+    busy = pending_keys()
+    now = time.time()
+    with store["lock"]:
+        for k in keys:
+            store["tables"].setdefault(k, {"header": None, "rows": [], "version": 0, "synced_at": 0, "full_at": 0, "stale": True})
+        tbls = {k: store["tables"][k] for k in keys}
+        # tab sibuk biasanya dilewati, kecuali belum pernah termuat atau ID-nya belum tertulis ke Sheets
+        # (op antrean tidak bisa dikirim sebelum itu); op antreannya diterapkan ulang sesudah pull
+        due = [k for k in keys if (k not in busy or not tbls[k]["header"] or tbls[k].get("ids_unsaved"))
+               and tbls[k]["version"] == seen.get(k, 0)
+               and (tbls[k]["stale"] or now - tbls[k]["synced_at"] >= SYNC_TTL)]
+        if not due: return
+        replay = {k for k in due if k in busy}  # op antrean belum pernah menyentuh salinan lokalnya
+        full = [k for k in due if not tbls[k]["header"] or now - tbls[k]["full_at"] > FULL_RESYNC_EVERY]
+        delta = [k for k in due if k not in full]
+        ranges = [absolute_range_name(_sheet(k).title) for k in full]
+        for k in delta:
+            last_col = rowcol_to_a1(1, len(tbls[k]["header"])).rstrip("0123456789")
+            ranges += [absolute_range_name(_sheet(k).title, "1:1"), absolute_range_name(_sheet(k).title, f"A{len(tbls[k]['rows']) + 1}:{last_col}")]
+    unchanged = lambda k: tbls[k]["version"] == seen.get(k, 0)
+    timings, applied, refetch = {}, [], []
+
+    t0 = time.perf_counter(); res = _batch_fetch(ranges); rtt = time.perf_counter() - t0
+    loaded = {k: _prepare(values) for k, values in zip(full, res)}
+    res = res[len(full):]
+    with store["lock"]:
+        for k in [k for k in full if unchanged(k)]:
+            _reload(k, tbls[k], loaded[k]); timings[k] = {"mode": "full", "rows": len(tbls[k]["rows"]), "ms": rtt * 1000}; applied.append(k)
+        for j, k in enumerate(delta):
+            if not unchanged(k): continue
+            added = _apply_delta(tbls[k], res[2 * j], res[2 * j + 1])
+            if added is False: refetch.append(k); continue
+            if added: _persist(k, tbls[k], len(tbls[k]["rows"]) - added)
+            timings[k] = {"mode": "delta", "rows": added, "ms": rtt * 1000}; applied.append(k)
+        seen.update((k, tbls[k]["version"]) for k in applied)
+
+    if refetch:
+        t0 = time.perf_counter(); res = _batch_fetch([absolute_range_name(_sheet(k).title) for k in refetch]); rtt2 = time.perf_counter() - t0
+        loaded = {k: _prepare(values) for k, values in zip(refetch, res)}
+        with store["lock"]:
+            for k in [k for k in refetch if unchanged(k)]:
+                _reload(k, tbls[k], loaded[k]); timings[k] = {"mode": "full", "rows": len(tbls[k]["rows"]), "ms": (rtt + rtt2) * 1000}
+                applied.append(k); seen[k] = tbls[k]["version"]
+
+    id_writes, id_errors = [], {}
+    with store["lock"]:
+        for k in [k for k in applied if unchanged(k)]:
+            w = _assign_ids(tbls[k])
+            if w: _persist(k, tbls[k], w[0]); id_writes.append((k, w[1], w[2]))
+            else: tbls[k].update(synced_at=now, stale=False)
+    for k, rng, block in id_writes:
+        try: _sheet(k).update(range_name=rng, values=block)
+        except Exception as e: id_errors[k] = e
+    with store["lock"]:  # baru dianggap tersinkron setelah ID-nya ada di Sheets
+        for k, _, _ in id_writes:
+            if k in id_errors: tbls[k].update(stale=True, full_at=0, ids_unsaved=True)  # reload penuh + tulis ulang
+            else: tbls[k].update(synced_at=now, stale=False, ids_unsaved=False)
+    store["last_sync"] = {"at": datetime.now().strftime("%H:%M:%S"), "requests": 1 + bool(refetch) + len(id_writes), "sheets": timings}
+    store["sync_error"] = "; ".join(f"tulis ID {k}: {e}" for k, e in id_errors.items()) or None
+    if replay & set(applied): _replay_pending(replay & set(applied))
+
+def _replay_pending(keys):
+    """Terapkan op antrean ke tab yang baru termuat (mis. setelah restart / migrasi mirror)."""
+    q = get_write_queue()
+    with q["lock"]:
+        for op in q["ops"]:
+            if op["key"] in keys: _apply_local(op)
+
+def sync_mark_stale(*keys):
+    """Tandai sheet perlu dicek ulang (delta) di run berikutnya."""
+    for tbl in [get_sync_store()["tables"].get(k) for k in (keys or SHEET_KEYS)]:
+        if tbl: tbl["stale"] = True
+
+DATA_VERSIONS = {}  # versi data tiap sheet yang dipakai di run ini
+
+def get_frame(key):
+    """
+    Frame bertipe (lihat schema.py) untuk versi data terkini. Hanya baris sejak perubahan
+    pertama yang di-parse ulang; frame dipakai bersama semua sesi, jadi read-only.
+    """
+    store = get_sync_store()
+    with store["lock"]:
+        tbl = store["tables"].get(key)
+        if not tbl or not tbl["header"]: return parse_frame(key, header_for(key), [])
+        if tbl.get("df_version") != tbl["version"]:
+            count("cache.frame.miss")
+            start = tbl.get("dirty_from", 0)
+            if tbl.get("df_header") != tbl["header"]: start = 0
+            head = tbl["df"].iloc[:start] if start else None
+            with span(f"parse_frame.{key}", "data", rows=len(tbl["rows"]) - start):
+                tail = parse_frame(key, tbl["header"], tbl["rows"][start:])
+            tbl["df"] = concat_frames(head, tail) if start else tail
+            for mark in ("agg_dirty_from", "search_dirty_from"):  # watermark agregat & indeks pencarian
+                tbl[mark] = min(tbl.get(mark, start), start)
+            tbl.update(df_version=tbl["version"], df_header=list(tbl["header"]), dirty_from=len(tbl["rows"]))
+        else: count("cache.frame.hit")
+        DATA_VERSIONS[key] = tbl["df_version"]
+        return tbl["df"]
+
+@traced(cat="data")
 def load_all_data():
-    if not sheets: return None, None, None, None, None
-    try:
-        def safe_get(key):
-            try: return pd.DataFrame(sheets[key].get_all_records())
-            except: return pd.DataFrame()
-
-        df_todo = safe_get("todo")
-        df_fin = safe_get("fin")
-        df_habit = safe_get("habit")
-        df_journal = safe_get("journal")
-        df_advisor = safe_get("advisor")
-        return df_todo, df_fin, df_habit, df_journal, df_advisor
-    except:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-df_todo, df_fin, df_habit, df_journal, df_advisor = load_all_data()
-
-# --- 4. SETUP AI ---
-model = None
-try:
-    if "GEMINI_API_KEY" in st.secrets:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        safe_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
-        model = genai.GenerativeModel('models/gemini-2.5-flash', safety_settings=safe_settings)
-except: pass
+    """
+    Frame dari salinan lokal (mirror). Di run ini hanya tab yang belum punya data atau ditandai
+    stale yang di-sync; cek TTL berkala dikerjakan reconciler latar (lihat 3b).
+    """
+    store = get_sync_store(); get_write_queue()  # pastikan reconciler sudah jalan
+    need = [k for k in SHEET_KEYS if k not in store["tables"] or store["tables"][k]["stale"]]
+    if store["sheets"] and need:
+        try: sync_all(need)
+        except Exception as e: store["sync_error"] = str(e)  # tetap tampilkan salinan lokal terakhir
+    return tuple(get_frame(k) for k in SHEET_KEYS)
+
+# --- AGREGAT (materialized, diperbarui inkremental) ---
+XP_PER_TODO, XP_PER_HABIT = 15, 10
+
+def _agg_rows(key, df):
+    """Agregat kecil untuk potongan baris; hasil beberapa potongan bisa dijumlahkan (_agg_merge)."""
+    if key == "fin":
+        out = df[df['Tipe'] == 'Pengeluaran']
+        return {"spend_total": int(out['Jumlah'].sum()),
+                "spend_by_cat": out.groupby('Kategori', observed=True)['Jumlah'].sum(),
+                "spend_by_day": out.groupby(out['Tanggal'].dt.normalize())['Jumlah'].sum()}
+    if key == "todo":
+        return {"done": int((df['Status'] == 'Selesai').sum()), "pending": int((df['Status'] == 'Pending').sum()),
+                "by_prio": df['Prioritas'].astype(str).value_counts()}
+    if key == "habit":
+        done = df[df['Status'] == 'Done']
+        return {"done": len(done), "done_by_habit": done['Habit'].value_counts(),
+                "done_by_day": done.groupby(done['Tanggal'].dt.normalize()).size()}
+    if key == "focus":
+        return {"minutes": int(df['Menit'].sum()), "sessions": len(df)}
+    return {"rows": len(df)}
+
+def _agg_merge(a, b):
+    return {k: a[k].add(b[k], fill_value=0) if isinstance(a[k], pd.Series) else a[k] + b[k] for k in a}
+
+def get_aggregates(key):
+    """
+    Total berjalan per sheet. Kalau sejak perhitungan terakhir hanya ada baris baru di ekor
+    (append/delta sync), cukup baris baru itu yang dihitung lalu dijumlahkan ke total lama.
+    """
+    get_frame(key)  # pastikan frame bertipe sudah versi terbaru
+    store = get_sync_store()
+    with store["lock"]:
+        tbl = store["tables"].get(key)
+        if not tbl or tbl.get("df") is None: return _agg_rows(key, parse_frame(key, header_for(key), []))
+        df, prev = tbl["df"], tbl.get("agg")
+        if prev and prev["version"] == tbl["df_version"]: count("cache.agg.hit"); return prev["value"]
+        count("cache.agg.miss")
+        start = prev["rows"] if prev and tbl.get("agg_dirty_from", 0) >= prev["rows"] else 0
+        part = _agg_rows(key, df.iloc[start:])
+        value = _agg_merge(prev["value"], part) if start else part
+        tbl["agg"] = {"version": tbl["df_version"], "rows": len(df), "value": value}
+        tbl["agg_dirty_from"] = len(df)
+        return value
+
+def memo(key, name, build):
+    """Hitung turunan data (index, pivot, agregat) sekali per versi sheet, dibagi antar sesi."""
+    tbl = get_sync_store()["tables"].get(key)
+    version = DATA_VERSIONS.get(key)
+    if not tbl or version is None: return build()
+    cache = tbl.setdefault("memo", {})
+    hit = cache.get(name)
+    if hit and hit[0] == version: count("cache.memo.hit"); return hit[1]
+    count("cache.memo.miss")
+    with span(f"memo.{key}.{name.split(':')[0]}", "data"): val = build()
+    if version == tbl["version"]: cache[name] = (version, val)  # jangan simpan hasil dari versi usang
+    return val
+
+# --- 3b. ANTREAN TULIS (Write-Behind) ---
+# Urutan kunci: q["lock"] -> store["lock"] -> mirror. Jangan ambil q["lock"] sambil memegang store["lock"].
+FLUSH_INTERVAL = 2     # detik antar flush ke Google
+MAX_RETRY_DELAY = 60   # batas backoff saat flush gagal
+UNRESOLVED_TRIES = 5   # putaran flush edit/hapus ditahan kalau ID-nya belum ada di Sheets, lalu dibatalkan
+
+@st.cache_resource
+def get_write_queue():
+    """Antrean mutasi bersama (outbox di mirror, tahan restart) + reconciler latar ke Sheets."""
+    # op dari outbox mungkin sudah sempat terkirim sebelum restart -> diperiksa dulu sebelum dikirim ulang
+    q = {"lock": threading.Lock(), "wake": threading.Event(), "ops": [dict(op, sent=True) for op in get_mirror().outbox()],
+         "error": None, "attempts": 0, "flushed_at": None, "dropped": None}
+    threading.Thread(target=_reconcile_worker, args=(q,), daemon=True).start()
+    return q
+
+def _cell(v):
+    # Samakan dengan nilai FORMATTED_VALUE dari Sheets supaya jangkar delta tetap cocok
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return str(v)
+
+def _apply_local(op):
+    """Terapkan op ke salinan lokal + mirror. Edit/hapus menyentuh mirror per ID, bukan seluruh ekor."""
+    store, mirror = get_sync_store(), get_mirror()
+    with store["lock"]:
+        tbl = store["tables"].get(op["key"])
+        if not tbl or not tbl["header"]: return
+        header, rows = tbl["header"], tbl["rows"]
+        c = header.index(ID_COL)
+        if op["kind"] == "append":
+            if op.get("sent") and any(r[c] == op.get("id") for r in rows): return  # sudah sampai & ikut ter-pull
+            _touch(tbl, len(rows)); rows.append(_fit([_cell(v) for v in op["row"]], len(header)))
+            _persist(op["key"], tbl, len(rows) - 1)
+        elif op["kind"] == "update" and op["col"] in header:
+            j = header.index(op["col"])
+            hit = [i for i, r in enumerate(rows) if r[c] == op["id"]]
+            for i in hit: rows[i][j] = _cell(op["value"])
+            if hit: _touch(tbl, hit[0]); mirror.update_cell(op["key"], op["id"], j, _cell(op["value"]))
+        elif op["kind"] == "delete":
+            ids = set(op["ids"])
+            hit = [i for i, r in enumerate(rows) if r[c] in ids]
+            if hit: tbl["rows"] = [r for r in rows if r[c] not in ids]; _touch(tbl, hit[0]); mirror.delete(op["key"], ids)
+
+def _enqueue(op):
+    q = get_write_queue()
+    with q["lock"]:
+        op["seq"] = get_mirror().outbox_add(op)  # dicatat dulu supaya tidak hilang saat offline/restart
+        _apply_local(op)
+        q["ops"].append(op)
+
+def enqueue_append(key, row):
+    """Tambah baris baru (ID dibuat di sini). Mengembalikan ID baris tersebut."""
+    tbl = get_sync_store()["tables"].get(key)
+    header = tbl["header"] if tbl and tbl["header"] else None
+    row, rid = list(row), new_id()
+    if header and ID_COL in header:
+        row = _fit(row, len(header)); row[header.index(ID_COL)] = rid
+    else: row.append(rid)
+    _enqueue({"kind": "append", "key": key, "row": row, "id": rid})
+    return rid
+
+def enqueue_update(key, rid, col, value): _enqueue({"kind": "update", "key": key, "id": rid, "col": col, "value": value})
+def enqueue_delete(key, ids): _enqueue({"kind": "delete", "key": key, "ids": [i for i in ids if i]})
+
+def pending_keys():
+    q = get_write_queue()
+    with q["lock"]: return {op["key"] for op in q["ops"]}
+
+def _cell_data(v):
+    if isinstance(v, bool): return {"userEnteredValue": {"boolValue": v}}
+    if isinstance(v, (int, float)): return {"userEnteredValue": {"numberValue": v}}
+    return {"userEnteredValue": {"stringValue": str(v)}}
+
+def _row_spans(rows):
+    """Indeks baris (0-based, unik) -> rentang [start, end) yang bersebelahan, urut dari bawah."""
+    spans = []
+    for r in sorted(set(rows), reverse=True):
+        if spans and spans[-1][0] == r + 1: spans[-1][0] = r
+        else: spans.append([r, r + 1])
+    return spans
+
+def _done(q, ops):
+    done = {id(op) for op in ops}
+    with q["lock"]:
+        q["ops"] = [op for op in q["ops"] if id(op) not in done]
+        get_mirror().outbox_remove([op["seq"] for op in ops if "seq" in op])
+
+def _id_positions(conn, keys):
+    """
+    Per sheet: (header di Sheets, ID -> posisi baris saat ini (1 = baris pertama setelah header)).
+    Kolom ID dibaca dari header di Sheets (1:1, ikut values:batchGet yang sama dengan kolom tebakan
+    dari salinan lokal), karena tab dengan op antrean bisa saja belum pernah termuat. Tebakan
+    meleset / tidak ada -> satu batchGet lagi khusus kolom yang benar.
+    """
+    tables, book = get_sync_store()["tables"], conn[keys[0]].spreadsheet
+    col = lambda header: rowcol_to_a1(1, header.index(ID_COL) + 1).rstrip("0123456789")
+    local = {k: (tables.get(k) or {}).get("header") or [] for k in keys}
+    guess = {k: col(h) for k, h in local.items() if ID_COL in h}
+    resp = book.values_batch_get([absolute_range_name(conn[k].title, "1:1") for k in keys]
+                                 + [absolute_range_name(conn[k].title, f"{c}:{c}") for k, c in guess.items()])["valueRanges"]
+    headers = {k: _trim((vr.get("values") or [[]])[0]) for k, vr in zip(keys, resp)}
+    cols = dict(zip(guess, resp[len(keys):]))
+    want = {k: col(h) for k, h in headers.items() if ID_COL in h}
+    miss = [k for k in want if guess.get(k) != want[k]]
+    if miss:
+        cols.update(zip(miss, book.values_batch_get([absolute_range_name(conn[k].title, f"{want[k]}:{want[k]}") for k in miss])["valueRanges"]))
+    return {k: (headers[k], {v[0]: i for i, v in enumerate(cols[k].get("values", [])) if v and i > 0} if k in want else {})
+            for k in keys}
+
+def _flush_once(q):
+    """
+    Satu putaran flush:
+    1. insert -> satu append_rows per sheet
+    2. ID -> posisi baris saat ini, dibaca dari kolom ID semua sheet dalam satu values:batchGet
+    3. semua edit + delete (lintas sheet) -> satu spreadsheets.batchUpdate
+    Tulis yang gagal tidak diulang gateway (bisa saja sudah diterapkan); putaran berikutnya membaca
+    ulang kolom ID: append yang ID-nya sudah ada tidak dikirim lagi, ID yang sudah terhapus terlewati.
+    Edit/hapus yang ID-nya tidak ada di Sheets (dan belum pernah terkirim) tetap di antrean lalu
+    dilaporkan; setelah UNRESOLVED_TRIES putaran dibatalkan dan tab-nya di-reload penuh.
+    """
+    with q["lock"]: ops = list(q["ops"])
+    conn, errors, failed = get_sync_store()["sheets"], [], set()
+    retry = list(dict.fromkeys(op["key"] for op in ops if op["kind"] == "append" and op.get("sent") and op.get("id")))
+    try: landed = {k: ids for k, (_, ids) in _id_positions(conn, retry).items()} if retry else {}
+    except Exception as e: return f"cek ID: {e}"
+    for key in dict.fromkeys(op["key"] for op in ops if op["kind"] == "append"):
+        run = [op for op in ops if op["key"] == key and op["kind"] == "append"]
+        there = [op for op in run if op.get("id") in landed.get(key, ())]
+        if there: _done(q, there); run = [op for op in run if op.get("id") not in landed[key]]
+        if not run: continue
+        for op in run: op["sent"] = True  # gagal di tengah jalan -> belum tentu tidak masuk
+        try: conn[key].append_rows([op["row"] for op in run]); _done(q, run)
+        except Exception as e: errors.append(f"{key}: {e}"); failed.add(key)
+
+    edits = [op for op in ops if op["kind"] != "append" and op["key"] not in failed]
+    if edits:
+        try:
+            keys = list(dict.fromkeys(op["key"] for op in edits))
+            remote = _id_positions(conn, keys)
+            where = {k: ids for k, (_, ids) in remote.items()}
+            gone = {(op["key"], i) for op in edits if op["kind"] == "delete" for i in op["ids"]}
+            updates, deletes, ready, held = [], {k: [] for k in keys}, [], []
+            for op in edits:
+                ws, header = conn[op["key"]], remote[op["key"]][0]
+                if op["kind"] == "update":
+                    if (op["key"], op["id"]) in gone: ready.append(op); continue  # barisnya ikut dihapus
+                    if op["id"] not in where[op["key"]] or op["col"] not in header: held.append(op); continue
+                    updates.append({"updateCells": {
+                        "start": {"sheetId": ws.id, "rowIndex": where[op["key"]][op["id"]], "columnIndex": header.index(op["col"])},
+                        "rows": [{"values": [_cell_data(op["value"])]}], "fields": "userEnteredValue"}})
+                else:
+                    # ID hilang wajar kalau op ini sudah pernah terkirim (bisa jadi sudah terhapus)
+                    if not op.get("sent") and any(i not in where[op["key"]] for i in op["ids"]): held.append(op); continue
+                    deletes[op["key"]] += [where[op["key"]][i] for i in op["ids"] if i in where[op["key"]]]
+                ready.append(op)
+            requests = updates + [
+                {"deleteDimension": {"range": {"sheetId": conn[k].id, "dimension": "ROWS", "startIndex": a, "endIndex": b}}}
+                for k in keys for a, b in _row_spans(deletes[k])]
+            for op in ready: op["sent"] = True
+            if requests: conn[keys[0]].spreadsheet.batch_update({"requests": requests})
+            _done(q, ready)
+            if held: errors.append(_hold_unresolved(q, held))
+        except Exception as e: errors.append(f"edit/delete: {e}")
+    return "; ".join(errors) or None
+
+def _hold_unresolved(q, held):
+    """Edit/hapus yang ID-nya belum ada di Sheets: tahan, lalu batalkan dan reload penuh tab-nya."""
+    for op in held: op["tries"] = op.get("tries", 0) + 1
+    drop = [op for op in held if op["tries"] >= UNRESOLVED_TRIES]
+    if drop:
+        _done(q, drop)
+        keys = sorted({op["key"] for op in drop})
+        store = get_sync_store()
+        with store["lock"]:  # salinan lokal masih memuat perubahan yang dibatalkan
+            for k in keys:
+                if k in store["tables"]: store["tables"][k].update(stale=True, full_at=0)
+        q["dropped"] = f"{datetime.now():%H:%M:%S} · {len(drop)} perubahan di {', '.join(keys)} dibatalkan: barisnya tidak ditemukan di Google Sheets"
+        q["wake"].set()
+    return f"{len(held)} edit/hapus menunggu ID baris muncul di Google Sheets"
+
+def _reconcile_worker(q):
+    """
+    Rekonsiliasi dua arah selama ada koneksi: push outbox ke Sheets, lalu pull delta tab yang
+    lewat SYNC_TTL ke mirror. Offline -> diam saja; gagal push -> backoff lalu coba lagi.
+    """
+    delay = FLUSH_INTERVAL
+    while True:
+        q["wake"].wait(delay); q["wake"].clear()
+        store = get_sync_store()
+        if not store["sheets"]: continue
+        if q["ops"]:
+            error = _flush_once(q)
+            if error:
+                q["attempts"] += 1; q["error"] = error
+                delay = min(MAX_RETRY_DELAY, FLUSH_INTERVAL * 2 ** q["attempts"])
+            else:
+                q.update(error=None, attempts=0, flushed_at=datetime.now().strftime("%H:%M:%S")); delay = FLUSH_INTERVAL
+        else: q.update(error=None, attempts=0); delay = FLUSH_INTERVAL  # op yang ditahan sudah dibatalkan
+        try: sync_all()  # tab sibuk tetap dilewati; tulis ID yang tertunda bisa membuka op yang ditahan
+        except Exception as e: store["sync_error"] = str(e)
+
+def wait_for_flush(timeout=15):
+    """Dipakai sebelum operasi admin yang menulis langsung ke Sheets."""
+    q = get_write_queue(); q["wake"].set(); end = time.time() + timeout
+    while q["ops"] and time.time() < end: time.sleep(0.2)
+    return not q["ops"]
+
+df_todo, df_fin, df_habit, df_journal, df_advisor, df_focus = load_all_data()
+
+# --- 4. SETUP AI (model disiapkan warm-up) ---
+model = load_model()
+
+# --- ANALISIS JURNAL (1 request terstruktur + cache) ---
+MOOD_MAP = {"Senang": 5, "Semangat": 5, "Netral": 3, "Biasa": 3, "Lelah": 2, "Sedih": 1, "Marah": 1}
+AI_CONCURRENCY = 4  # batas request Gemini paralel saat analisis ulang arsip
+
+@st.cache_resource
+def get_ai_cache():
+    """Hasil analisis per hash isi jurnal, dibagi antar sesi."""
+    return {"lock": threading.Lock(), "items": {}}
+
+def _parse_analysis(text):
+    """Balasan apa pun (JSON bukan objek, JSON rusak, teks biasa) jatuh ke Netral / "-", tidak error."""
+    try: data = json.loads(text)
+    except ValueError:
+        m = re.search(r"\{.*\}", text or "", re.S)  # model kadang membungkus JSON dengan ```json
+        try: data = json.loads(m.group(0)) if m else {}
+        except ValueError: data = {}
+    if not isinstance(data, dict): data = {}
+    mood = str(data.get("mood") or "").strip().capitalize()
+    saran = str(data.get("saran") or "").strip()
+    if mood not in MOOD_MAP: mood = "Netral"
+    return mood, saran or "-"
+
+def gemini_usage(meta, res):
+    """Catat jumlah token dari usage_metadata respons Gemini ke meta span."""
+    u = getattr(res, "usage_metadata", None)
+    if u: meta.update(prompt_tokens=getattr(u, "prompt_token_count", None), output_tokens=getattr(u, "candidates_token_count", None))
+
+def analyze_journal(text, cache=None):
+    """Mood + saran dalam satu panggilan Gemini (JSON), di-cache berdasarkan hash isi jurnal."""
+    key = hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+    cache = cache or get_ai_cache()
+    with cache["lock"]:
+        if key in cache["items"]: count("cache.ai.hit"); return cache["items"][key]
+    count("cache.ai.miss")
+    prompt = (
+        "Analisis jurnal berikut. Balas HANYA JSON dengan format "
+        '{"mood": "<satu kata>", "saran": "<1 kalimat saran singkat yang supportif>"}. '
+        f"Pilihan mood: {', '.join(MOOD_MAP)}.\n\nJurnal: {text}"
+    )
+    with span("gemini.analyze_journal", "gemini") as meta:
+        res = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        gemini_usage(meta, res)
+    result = _parse_analysis(res.text)
+    with cache["lock"]: cache["items"][key] = result
+    return result
+
+def reanalyze_journal(df, only_invalid=True, progress=None):
+    """Analisis ulang arsip jurnal secara paralel (dibatasi AI_CONCURRENCY); hasil masuk antrean tulis."""
+    if only_invalid: df = df[~df['AI_Mood'].isin(list(MOOD_MAP))]
+    rows = df[['ID', 'Isi_Jurnal']].to_dict("records")
+    done, failed, cache, job = 0, 0, get_ai_cache(), tracing.bind(analyze_journal)
+    with ThreadPoolExecutor(max_workers=AI_CONCURRENCY) as pool:
+        futures = {pool.submit(job, str(r['Isi_Jurnal']), cache): r['ID'] for r in rows}
+        for fut in as_completed(futures):
+            try:
+                mood, saran = fut.result()
+                enqueue_update("journal", futures[fut], "AI_Mood", mood)
+                enqueue_update("journal", futures[fut], "AI_Saran", saran)
+            except Exception: failed += 1
+            done += 1
+            if progress: progress.progress(done / len(rows), text=f"{done}/{len(rows)} entri")
+    return len(rows) - failed, failed
+
+# --- PENCARIAN ARSIP (Inverted Index BM25) ---
+SEARCH_FIELDS = {"journal": ("Tanggal", ["Isi_Jurnal", "AI_Saran"]), "advisor": ("Timestamp", ["Pertanyaan", "Jawaban"])}
+@st.cache_resource
+def get_search_index():
+    return SearchIndex(SEARCH_FIELDS, ID_COL)
+
+@traced(cat="data")
+def search_archive(query, k=5, mode="similar", exclude=()):
+    index, store = get_search_index(), get_sync_store()
+    with index.lock:  # watermark yang sudah diambil harus sampai ke indeks sebelum sesi lain mengambilnya
+        for key in ("journal", "advisor"):
+            get_frame(key)  # frame terkini, aman di fragment rerun
+            with store["lock"]:  # frame, versi & watermark diambil bersamaan
+                tbl = store["tables"].get(key)
+                if not tbl or tbl.get("df") is None: continue
+                df, version = tbl["df"], tbl["df_version"]
+                start = tbl.get("search_dirty_from", 0); tbl["search_dirty_from"] = len(df)
+            index.sync(key, df, version, start)
+    return index.search(query, k, mode, exclude)
+
+# --- ADVISOR (streaming + konteks terbatas) ---
+ADVISOR_CONTEXT_TOKENS = 2000  # anggaran token riwayat yang ikut dikirim
+
+def approx_tokens(text):
+    return len(str(text)) // 4 + 1  # perkiraan kasar ~4 karakter per token
+
+def build_advisor_context(df, budget=ADVISOR_CONTEXT_TOKENS):
+    """Giliran tanya-jawab terbaru dari df_advisor, mundur dari yang terakhir sampai anggaran token habis."""
+    if df is None or df.empty or not {'Pertanyaan', 'Jawaban'} <= set(df.columns): return []
+    turns, used = [], 0
+    for q, a in zip(df['Pertanyaan'].iloc[::-1], df['Jawaban'].iloc[::-1]):
+        cost = approx_tokens(q) + approx_tokens(a)
+        if used + cost > budget: break
+        turns.append((q, a)); used += cost
+    contents = []
+    for q, a in reversed(turns):
+        contents += [{"role": "user", "parts": [str(q)]}, {"role": "model", "parts": [str(a)]}]
+    return contents
+
+ADVISOR_RECALL_K = 3  # jumlah catatan lama paling relevan yang ikut dikirim
+
+def build_recall_context(question, history_size):
+    """Top-k jurnal/jawaban lama yang relevan dengan pertanyaan, di luar jendela riwayat terbaru."""
+    recent, df = set(), get_frame("advisor")
+    if history_size and ID_COL in df.columns:
+        recent = {f"advisor:{i}" for i in df[ID_COL].iloc[-history_size:]}
+    hits = search_archive(question, ADVISOR_RECALL_K, exclude=recent)
+    if not hits: return []
+    notes = "\n".join(f"- [{m['date']}] {m['title'][:300]} -> {m['body'][:300]}" for _, m in hits)
+    return [{"role": "user", "parts": [f"Catatan relevan dari arsip saya (pakai jika membantu):\n{notes}"]},
+            {"role": "model", "parts": ["Baik, saya akan memperhatikan catatan tersebut."]}]
+
+def stream_answer(contents):
+    with span("gemini.stream_answer", "gemini") as meta:
+        t0, chunk = time.perf_counter(), None
+        for chunk in model.generate_content(contents, stream=True):
+            meta.setdefault("ttft_ms", (time.perf_counter() - t0) * 1000)
+            try: yield chunk.text
+            except ValueError: continue  # chunk tanpa teks (mis. hanya metadata/safety)
+        gemini_usage(meta, chunk)  # usage_metadata lengkap ada di chunk terakhir
 
 # --- UTILITIES ---
-def clear_cache_and_rerun():
-    load_all_data.clear()
+def clear_cache_and_rerun(*keys):
+    sync_mark_stale(*keys)
     st.rerun()
 
 def fix_headers_only():
     if not sheets: return
     try:
-        sheets["todo"].update("A1:D1", [["Tanggal", "Task", "Prioritas", "Status"]])
-        sheets["fin"].update("A1:E1", [["Tanggal", "Item", "Kategori", "Jumlah", "Tipe"]])
-        sheets["habit"].update("A1:C1", [["Tanggal", "Habit", "Status"]])
-        sheets["journal"].update("A1:D1", [["Tanggal", "Isi_Jurnal", "AI_Mood", "AI_Saran"]])
-        sheets["advisor"].update("A1:C1", [["Timestamp", "Pertanyaan", "Jawaban"]])
+        wait_for_flush()
+        for key in SHEET_KEYS:
+            h = header_for(key); sheets[key].update(f"A1:{rowcol_to_a1(1, len(h))}", [h])
         st.toast("Tabel diperbaiki!", icon="🛠️"); clear_cache_and_rerun()
     except: pass
 
+# --- FOKUS TIMER (tanpa memblokir script) ---
+FOCUS_CHECK_EVERY = 15  # detik, fragment hanya mengecek apakah sesi sudah selesai
+FOCUS_XP_PER_MIN = 1
+
+def focus_countdown_html(end_ts, total_s):
+    """Hitung mundur berjalan di browser; server tidak mengirim delta apa pun per detik."""
+    return f"""
+    <div style="font-family:sans-serif;font-size:14px">
+      <div id="t" style="margin-bottom:4px"></div>
+      <div style="background:#eee;border-radius:4px;height:8px"><div id="b" style="background:#ff4b4b;height:8px;border-radius:4px;width:0"></div></div>
+    </div>
+    <script>
+      const end = {end_ts * 1000}, total = {total_s * 1000};
+      function tick() {{
+        const left = Math.max(0, end - Date.now()), s = Math.ceil(left / 1000);
+        document.getElementById("t").textContent = left > 0 ? `⏳ ${{Math.floor(s / 60)}}:${{String(s % 60).padStart(2, "0")}}` : "✅ Selesai!";
+        document.getElementById("b").style.width = `${{100 * (1 - left / total)}}%`;
+      }}
+      tick(); setInterval(tick, 1000);
+    </script>"""
+
+@st.fragment(run_every=FOCUS_CHECK_EVERY)
+def focus_timer_status():
+    f = st.session_state.get("focus")
+    if not f: return
+    end = f["start"] + f["minutes"] * 60
+    if time.time() >= end:
+        enqueue_append("focus", [str(datetime.now()), f["minutes"]])  # sesi selesai dicatat sebagai data (XP)
+        del st.session_state["focus"]; st.session_state["focus_done"] = f["minutes"]
+        st.rerun()
+    st.iframe(focus_countdown_html(end, f["minutes"] * 60), height=50)
+    if st.button("⏹️ Batal", key="focus_cancel"):
+        del st.session_state["focus"]; st.rerun()
+
+# --- HABIT MATRIX (Tanggal x Habit) ---
+def build_habit_matrix(df, today):
+    """
+    Pivot boolean tanggal x habit (True = Done), dari hari pertama data sampai hari ini.
+    Dibangun sekali per versi data; semua statistik habit dihitung dari sini.
+    """
+    days = df['Tanggal'].dt.normalize()
+    done = df['Status'] == 'Done'
+    habits = list(df['Habit'].unique())
+    if days.notna().sum() == 0:
+        return pd.DataFrame(False, index=pd.DatetimeIndex([today]), columns=habits), pd.Series(today, index=habits)
+    matrix = pd.crosstab(days[done], df.loc[done, 'Habit']).gt(0)
+    start, end = days.min(), max(days.max(), today)
+    matrix = matrix.reindex(index=pd.date_range(start, end), columns=habits, fill_value=False)
+    first_seen = days.groupby(df['Habit']).min().reindex(habits).fillna(today)
+    return matrix, first_seen
+
+def habit_stats(matrix, first_seen, today):
+    """Streak sekarang/terpanjang dan tingkat penyelesaian, semuanya operasi vektor per kolom."""
+    m = matrix.loc[:today]
+    run = m.cumsum() - m.cumsum().where(~m).ffill().fillna(0)  # panjang deret Done yang sedang berjalan
+    # Hari ini belum diceklis tidak memutus streak: pakai posisi kemarin
+    current = run.iloc[-1].where(m.iloc[-1], run.iloc[-2] if len(run) > 1 else 0)
+    active_days = (today - first_seen).dt.days + 1
+    return pd.DataFrame({
+        "Streak Sekarang": current.astype(int),
+        "Streak Terpanjang": run.max().astype(int),
+        "Total Selesai": m.sum().astype(int),
+        "Completion %": (100 * m.sum() / active_days.clip(lower=1)).round(1),
+    })
+
+def habit_heatmap(matrix, today, habit=None, days=365):
+    """Heatmap kalender (minggu x hari) untuk satu tahun terakhir; ukurannya tetap berapa pun panjang riwayat."""
+    counts = (matrix[habit] if habit else matrix).loc[today - pd.Timedelta(days=days - 1):today]
+    if counts.ndim > 1: counts = counts.sum(axis=1)
+    counts = counts.astype(int).reindex(pd.date_range(today - pd.Timedelta(days=days - 1), today), fill_value=0)
+    cal = pd.DataFrame({"c": counts.values, "wd": counts.index.dayofweek,
+                        "wk": counts.index.to_period("W").start_time}, index=counts.index)
+    grid = cal.pivot(index="wd", columns="wk", values="c").reindex(range(7))
+    fig = px.imshow(grid, color_continuous_scale="Greens", aspect="auto",
+                    labels={"x": "Minggu", "y": "", "color": "Selesai"})
+    fig.update_yaxes(tickvals=list(range(7)), ticktext=["Sen", "Sel", "Rab", "Kam", "Jum", "Sab", "Min"])
+    return fig
+
 # --- FUNGSI ARSIP PINTAR (UNIVERSAL) ---
-def render_archive_system(df, date_col, title_col, subtitle_col=None, type_col=None):
+ARCHIVE_DAYS_PER_PAGE = 7
+
+def build_archive_index(df, date_col):
+    """
+    Index Tahun > Bulan > Hari dari satu groupby per tanggal.
+    Hasil: {"tree": {tahun: {bulan: [hari, ...]}}, "rows": {hari: posisi baris}} (terbaru dulu).
+    """
+    days = df[date_col].dt.normalize()
+    groups = pd.Series(range(len(df))).groupby(days.values).indices
+    tree = {}
+    for d in sorted(groups, reverse=True):
+        tree.setdefault(d.year, {}).setdefault(d.month, []).append(d)
+    return {"tree": tree, "rows": groups}
+
+def render_archive_system(df, date_col, title_col, subtitle_col=None, type_col=None, key=None):
     """
     Fungsi canggih untuk membuat arsip bertingkat: Tahun > Bulan > Hari.
     Digunakan ulang di ToDo, Uang, Jurnal, dan Advisor.
+    Index dibangun sekali per versi data; yang dirender hanya bulan yang sedang dipilih.
     """
     if df.empty:
         st.caption("Belum ada data arsip.")
         return
 
+    with span(f"archive.{key}", "render"):
+        _render_archive(df, date_col, title_col, subtitle_col, type_col, key)
+
+def _render_archive(df, date_col, title_col, subtitle_col, type_col, key):
     try:
-        # 1. Persiapan Data Tanggal
-        df['DateObj'] = pd.to_datetime(df[date_col], errors='coerce')
-        df['Tahun'] = df['DateObj'].dt.year
-        df['Bulan'] = df['DateObj'].dt.month_name()
-        df['Hari'] = df['DateObj'].dt.day_name()
-        df['Tanggal_Angka'] = df['DateObj'].dt.day
-        
-        # Ambil daftar tahun unik
-        years = sorted(df['Tahun'].dropna().unique(), reverse=True)
-        
-        if not years:
+        idx = memo(key, f"archive:{date_col}", lambda: build_archive_index(df, date_col))
+        tree = idx["tree"]
+        if not tree:
             st.caption("Format tanggal data tidak valid.")
             return
 
-        # 2. Level 1: TAHUN (Expander)
-        for y in years:
-            with st.expander(f"📂 Arsip Tahun {int(y)}"):
-                df_year = df[df['Tahun'] == y]
-                
-                # Level 2: BULAN (Tabs agar rapi dan tidak nested expander error)
-                months = df_year['Bulan'].unique()
-                if len(months) > 0:
-                    tabs = st.tabs([str(m) for m in months])
-                    
-                    for i, m in enumerate(months):
-                        with tabs[i]:
-                            df_month = df_year[df_year['Bulan'] == m]
-                            
-                            # Level 3: HARI (Grouping by date)
-                            dates = sorted(df_month['Tanggal_Angka'].unique(), reverse=True)
-                            
-                            for d in dates:
-                                df_day = df_month[df_month['Tanggal_Angka'] == d]
-                                day_name = df_day['Hari'].iloc[0] if not df_day.empty else ""
-                                
-                                st.markdown(f"**🗓️ {day_name}, {int(d)} {m} {int(y)}**")
-                                
-                                # Render Item
-                                for idx, row in df_day.iterrows():
-                                    title = row[title_col]
-                                    sub = f"{row[subtitle_col]}" if subtitle_col and subtitle_col in row else ""
-                                    
-                                    # Warna khusus jika ada tipe (misal Keuangan)
-                                    color_str = ""
-                                    if type_col and type_col in row:
-                                        color = "red" if row[type_col] == "Pengeluaran" else "green"
-                                        color_str = f":{color}[{row[type_col]}]"
-                                    
-                                    st.caption(f"• {color_str} **{title}** {f'({sub})' if sub else ''}")
-                                st.divider()
+        # Level 1 & 2: TAHUN dan BULAN (hanya yang dipilih yang dirender)
+        c_y, c_m = st.columns(2)
+        y = c_y.selectbox("📂 Tahun", list(tree), key=f"arc_y_{key}")
+        m = c_m.selectbox("Bulan", list(tree[y]), format_func=lambda x: pd.Timestamp(year=2000, month=x, day=1).month_name(), key=f"arc_m_{key}_{y}")
+        days = tree[y][m]
+
+        # Level 3: HARI (dipaginasi)
+        pages = (len(days) - 1) // ARCHIVE_DAYS_PER_PAGE + 1
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Halaman (1-{pages})", 1, pages, 1, key=f"arc_p_{key}_{y}_{m}")
+        for d in days[(page - 1) * ARCHIVE_DAYS_PER_PAGE: page * ARCHIVE_DAYS_PER_PAGE]:
+            st.markdown(f"**🗓️ {d.day_name()}, {d.day} {d.month_name()} {d.year}**")
+
+            # Render Item
+            for row in df.iloc[idx["rows"][d]].to_dict("records"):
+                title = row[title_col]
+                sub = f"{row[subtitle_col]}" if subtitle_col and subtitle_col in row else ""
+
+                # Warna khusus jika ada tipe (misal Keuangan)
+                color_str = ""
+                if type_col and type_col in row:
+                    color = "red" if row[type_col] == "Pengeluaran" else "green"
+                    color_str = f":{color}[{row[type_col]}]"
+
+                st.caption(f"• {color_str} **{title}** {f'({sub})' if sub else ''}")
+            st.divider()
     except Exception as e:
         st.error(f"Gagal memuat arsip: {e}")
 
+def sync_problem():
+    """Pesan offline / kuota habis / sync gagal, atau None kalau sync sehat."""
+    store, quota = get_sync_store(), get_sheets_gateway().degraded()
+    if not store["sheets"]: return "📴 Offline: Google Sheets tidak terjangkau, perubahan disimpan lokal dan dikirim saat koneksi pulih."
+    if quota: return f"🚦 Kuota Google Sheets habis, sync dijeda {quota['retry_in']} detik."
+    if store.get("sync_error"): return f"⚠️ Gagal sync ke Google Sheets: {store['sync_error']}"
+
+@st.fragment(run_every=FLUSH_INTERVAL)
+def render_sync_banner():
+    """Status ditampilkan sebagai status, bukan data kosong; fragment sendiri supaya ikut berubah setelah tulis di tab."""
+    msg, store = sync_problem(), get_sync_store()
+    if msg: st.warning(f"{msg} Menampilkan salinan lokal (sync terakhir {(store.get('last_sync') or {}).get('at', '-')}).")
+
+@st.fragment(run_every=FLUSH_INTERVAL)
+def render_queue_status():
+    """Status antrean tulis; tab hanya me-rerun fragment-nya sendiri, jadi status ini menyegarkan diri."""
+    wq = get_write_queue()
+    if wq["error"]: st.warning(f"⚠️ Sync gagal (percobaan {wq['attempts']}), dicoba ulang otomatis: {wq['error']}")
+    elif wq["ops"]: st.caption(f"⏳ {len(wq['ops'])} perubahan menunggu dikirim ke Google Sheets")
+    else: st.caption(f"☁️ Semua perubahan tersimpan{' (' + wq['flushed_at'] + ')' if wq['flushed_at'] else ''}")
+    if wq["dropped"]:
+        st.warning(f"⚠️ {wq['dropped']}; tampilan dikembalikan ke isi Sheets.")
+        st.button("Tutup", key="dropped_ok", on_click=lambda: wq.update(dropped=None))
+    if wq["ops"] and st.button("🔄 Kirim Sekarang"): wq["wake"].set()
+
+def compute_xp():
+    agg_todo, agg_habit, agg_focus = (get_aggregates(k) for k in ("todo", "habit", "focus"))
+    xp_point = agg_todo["done"] * XP_PER_TODO + agg_habit["done"] * XP_PER_HABIT + agg_focus["minutes"] * FOCUS_XP_PER_MIN
+    return xp_point, int(xp_point / 200) + 1
+
+if sync_problem() and not any(t.get("header") for t in get_sync_store()["tables"].values()):
+    st.error(f"{sync_problem()} Data belum pernah termuat, muat ulang halaman sebentar lagi."); st.stop()
+render_sync_banner()
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.title("🧬 My Life OS")
     if st.button("🔒 Logout"): st.session_state["password_correct"] = False; st.rerun()
     st.divider()
 
-    xp_point = 0
-    if not df_todo.empty and 'Status' in df_todo.columns: xp_point += len(df_todo[df_todo['Status'] == 'Selesai']) * 15
-    if not df_habit.empty and 'Status' in df_habit.columns: xp_point += len(df_habit[df_habit['Status'] == 'Done']) * 10 
-    level = int(xp_point / 200) + 1
+    xp_point, level = compute_xp()
     st.metric(f"Level {level}", f"{xp_point} XP")
     st.progress((xp_point % 200) / 200)
     
-    with st.expander("🍅 Fokus Timer"):
-        menit = st.number_input("Menit", 1, 120, 25)
-        if st.button("Mulai"):
-            bar = st.progress(0); t_s = st.empty()
-            for i in range(menit * 60):
-                t_s.caption(f"{menit*60 - i}s"); bar.progress((i+1)/(menit*60)); time.sleep(1)
-            st.success("Selesai!")
+    with st.expander("🍅 Fokus Timer", expanded="focus" in st.session_state):
+        if "focus_done" in st.session_state:
+            st.success(f"Selesai! +{st.session_state.pop('focus_done') * FOCUS_XP_PER_MIN} XP")
+        if "focus" in st.session_state: focus_timer_status()
+        else:
+            menit = st.number_input("Menit", 1, 120, 25)
+            if st.button("Mulai"):
+                st.session_state["focus"] = {"start": time.time(), "minutes": int(menit)}; st.rerun()
     
     with st.expander("📥 Backup Excel"):
         if st.button("Download"):
@@ -217,62 +1055,78 @@ with st.sidebar:
                 df_fin.to_excel(w, sheet_name='Keuangan', index=False)
                 df_habit.to_excel(w, sheet_name='Habits', index=False)
                 df_journal.to_excel(w, sheet_name='Jurnal', index=False)
+                df_focus.to_excel(w, sheet_name='Fokus', index=False)
             st.download_button("Klik Download", out.getvalue(), f'Backup.xlsx', 'application/vnd.ms-excel')
 
     st.divider()
+    render_queue_status()
     if st.button("🛠️ Fix Error"): fix_headers_only()
 
-# --- TABS ---
-tab_home, tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🏠 Home", "📝 ToDo", "💰 Uang", "✅ Habit", "📔 Jurnal", "🤖 Advisor", "🗄️ Database"])
+# --- TABS (lazy: hanya tab yang dipilih yang dirender, tiap tab di-fragment) ---
+def rerun_tab(full=False):
+    """Setelah mutasi lokal cukup ulang tab ini; full=True kalau sidebar (XP) ikut berubah."""
+    if not full:
+        try: st.rerun(scope="fragment")
+        except StreamlitAPIException: pass  # dipanggil saat full run (mis. tab baru dipilih)
+    st.rerun()
+
+def traced_tab(name):
+    """Span render tab; pada fragment rerun (script utama tidak jalan) tab membuka trace sendiri."""
+    def deco(fn):
+        @wraps(fn)
+        def run():
+            if tracing.current() is not None and tracing.current() is st.session_state.get("trace_open"):
+                with span(f"tab.{name}", "render"): return fn()
+            tracing.start(f"fragment:{name}")
+            try:
+                with span(f"tab.{name}", "render"): return fn()
+            finally: keep_trace(tracing.detach())
+        return run
+    return deco
 
-with tab_home: # DASHBOARD
+@st.fragment
+@traced_tab("home")
+def tab_home(): # DASHBOARD
+    xp_point, level = compute_xp()
+    agg_todo, agg_fin, agg_habit = (get_aggregates(k) for k in ("todo", "fin", "habit"))
     st.header(f"Dashboard Level {level}")
     c1,c2,c3,c4 = st.columns(4)
-    out=0
-    if not df_fin.empty: 
-        df_fin['Jumlah'] = pd.to_numeric(df_fin['Jumlah'], errors='coerce').fillna(0)
-        out = df_fin[df_fin['Tipe']=='Pengeluaran']['Jumlah'].sum()
-    c1.metric("Pengeluaran", f"Rp {out:,.0f}")
-    
-    pen=0; 
-    if not df_todo.empty: pen = len(df_todo[df_todo['Status']=='Pending'])
-    c2.metric("Task Pending", pen)
-    
-    hab=0
-    if not df_habit.empty: hab = len(df_habit[(df_habit['Tanggal']==str(date.today())) & (df_habit['Status']=='Done')])
-    c3.metric("Habit Today", hab)
+    c1.metric("Pengeluaran", f"Rp {agg_fin['spend_total']:,.0f}")
+    c2.metric("Task Pending", agg_todo["pending"])
+    c3.metric("Habit Today", int(agg_habit["done_by_day"].get(pd.Timestamp(date.today()), 0)))
     c4.metric("Total XP", xp_point)
     
     st.divider()
     g1, g2 = st.columns(2)
     with g1:
         st.subheader("Porsi Pengeluaran")
-        if not df_fin.empty: 
-            df_out = df_fin[df_fin['Tipe']=='Pengeluaran']
-            if not df_out.empty: st.plotly_chart(px.pie(df_out, values='Jumlah', names='Kategori', hole=0.4), use_container_width=True)
+        by_cat = agg_fin["spend_by_cat"]
+        if by_cat.sum() > 0:
+            st.plotly_chart(memo("fin", "fig:pie", lambda: px.pie(names=by_cat.index.astype(str), values=by_cat.values, hole=0.4)), use_container_width=True)
     with g2:
         st.subheader("Konsistensi Habit")
-        if not df_habit.empty:
-            df_done = df_habit[df_habit['Status']=='Done']
-            if not df_done.empty: 
-                cnt=df_done['Habit'].value_counts().reset_index(); cnt.columns=['H','C']
-                st.plotly_chart(px.bar(cnt, x='C', y='H', orientation='h'), use_container_width=True)
+        by_habit = agg_habit["done_by_habit"]
+        if len(by_habit):
+            st.plotly_chart(memo("habit", "fig:konsistensi", lambda: px.bar(x=by_habit.values, y=by_habit.index, orientation='h', labels={"x": "C", "y": "H"})), use_container_width=True)
 
 # === TAB 1: TODO (VISUAL + ARCHIVE) ===
-with tab1:
+@st.fragment
+@traced_tab("todo")
+def tab_todo():
+    df_todo = get_frame("todo")
     c1,c2,c3=st.columns([3,1,1])
     with c1: t=st.text_input("Tugas", key="t")
     with c2: p=st.selectbox("Prio", ["Tinggi","Sedang","Rendah"], key="p")
     with c3: 
         st.write(""); 
-        if st.button("➕", use_container_width=True) and t: sheets["todo"].append_row([str(datetime.now()), t, p, "Pending"]); clear_cache_and_rerun()
+        if st.button("➕", use_container_width=True) and t: enqueue_append("todo", [str(datetime.now()), t, p, "Pending"]); rerun_tab()
     
     if not df_todo.empty:
         # Grafik & Tabel
-        with st.expander("📊 Grafik & Tabel"):
-             prio = df_todo['Prioritas'].value_counts().reset_index(); prio.columns=['P','C']
+        if st.toggle("📊 Grafik & Tabel", key="show_todo_chart"):
+             prio = get_aggregates("todo")["by_prio"].reset_index(); prio.columns=['P','C']
              c_g1, c_g2 = st.columns(2)
-             c_g1.plotly_chart(px.bar(prio, x='P', y='C', color='P', title="Distribusi Prioritas"), use_container_width=True)
+             c_g1.plotly_chart(memo("todo", "fig:prio", lambda: px.bar(prio, x='P', y='C', color='P', title="Distribusi Prioritas")), use_container_width=True)
              c_g2.dataframe(df_todo, use_container_width=True) 
         
         st.write("### 📌 Tugas Pending")
@@ -285,30 +1139,34 @@ with tab1:
                 with st.expander(f"{icon} {row['Task']} ({row['Prioritas']})"):
                     st.write(f"📅 {row['Tanggal']}")
                     c_act1, c_act2 = st.columns(2)
-                    if c_act1.button("✅ Selesai", key=f"done_{i}"):
-                        sheets["todo"].update_cell(i + 2, 4, "Selesai"); st.toast("Selesai!"); time.sleep(0.5); clear_cache_and_rerun()
-                    if c_act2.button("🗑️ Hapus", key=f"del_todo_{i}"):
-                        sheets["todo"].delete_rows(i + 2); st.toast("Dihapus"); time.sleep(0.5); clear_cache_and_rerun()
+                    if c_act1.button("✅ Selesai", key=f"done_{row['ID']}"):
+                        enqueue_update("todo", row["ID"], "Status", "Selesai"); st.toast("Selesai!"); rerun_tab(full=True)
+                    if c_act2.button("🗑️ Hapus", key=f"del_todo_{row['ID']}"):
+                        enqueue_delete("todo", [row["ID"]]); st.toast("Dihapus"); rerun_tab()
         
         st.divider()
         st.subheader("🗄️ Arsip Tugas (Tahun > Bulan > Hari)")
-        render_archive_system(df_todo, 'Tanggal', 'Task', 'Status')
+        if st.toggle("Tampilkan Arsip", key="show_arc_todo"): render_archive_system(df_todo, 'Tanggal', 'Task', 'Status', key="todo")
 
 # === TAB 2: UANG (VISUAL + ARCHIVE) ===
-with tab2:
+@st.fragment
+@traced_tab("uang")
+def tab_uang():
+    df_fin = get_frame("fin")
     with st.form("u"):
         c1,c2=st.columns(2); i=c1.text_input("Item"); k=c2.selectbox("Kat", ["Makan","Transport","Belanja","Tagihan","Lainnya"])
         c3,c4=st.columns(2); j=c3.number_input("Rp", step=1000); tp=c4.selectbox("Tipe", ["Pengeluaran","Pemasukan"])
-        if st.form_submit_button("Simpan"): sheets["fin"].append_row([str(datetime.now()), i, k, j, tp]); clear_cache_and_rerun()
+        if st.form_submit_button("Simpan"): enqueue_append("fin", [str(datetime.now()), i, k, j, tp]); rerun_tab()
     
     if not df_fin.empty:
         # Grafik
-        with st.expander("📊 Grafik Keuangan"):
-            df_trend = df_fin[df_fin['Tipe'] == 'Pengeluaran'].copy()
-            if not df_trend.empty:
-                df_trend['Tanggal'] = pd.to_datetime(df_trend['Tanggal']).dt.date
-                daily = df_trend.groupby('Tanggal')['Jumlah'].sum().reset_index()
-                st.plotly_chart(px.line(daily, x='Tanggal', y='Jumlah', markers=True, title="Tren Pengeluaran"), use_container_width=True)
+        if st.toggle("📊 Grafik Keuangan", key="show_fin_chart"):
+            by_day = get_aggregates("fin")["spend_by_day"]
+            if len(by_day):
+                daily = by_day.rename_axis('Tanggal').reset_index(name='Jumlah')
+                monthly = by_day.groupby(by_day.index.to_period('M').astype(str)).sum().rename_axis('Bulan').reset_index(name='Jumlah')
+                st.plotly_chart(memo("fin", "fig:trend", lambda: px.line(daily, x='Tanggal', y='Jumlah', markers=True, title="Tren Pengeluaran")), use_container_width=True)
+                st.plotly_chart(memo("fin", "fig:monthly", lambda: px.bar(monthly, x='Bulan', y='Jumlah', title="Pengeluaran per Bulan")), use_container_width=True)
 
         st.write("### 💳 20 Transaksi Terakhir")
         recent_fin = df_fin.tail(20)[::-1]
@@ -316,129 +1174,208 @@ with tab2:
             color = "red" if row['Tipe'] == "Pengeluaran" else "green"
             with st.expander(f":{color}[Rp {row['Jumlah']:,}] - {row['Item']}"):
                 st.write(f"📅 {row['Tanggal']} | 📂 {row['Kategori']}")
-                if st.button("🗑️ Hapus", key=f"del_fin_{i}"):
-                    sheets["fin"].delete_rows(i + 2); st.toast("Terhapus"); time.sleep(0.5); clear_cache_and_rerun()
+                if st.button("🗑️ Hapus", key=f"del_fin_{row['ID']}"):
+                    enqueue_delete("fin", [row["ID"]]); st.toast("Terhapus"); rerun_tab()
 
         st.divider()
         st.subheader("🗄️ Arsip Keuangan (Tahun > Bulan > Hari)")
-        render_archive_system(df_fin, 'Tanggal', 'Item', 'Jumlah', 'Tipe')
+        if st.toggle("Tampilkan Arsip", key="show_arc_fin"): render_archive_system(df_fin, 'Tanggal', 'Item', 'Jumlah', 'Tipe', key="fin")
 
 # === TAB 3: HABIT (VISUAL + ARCHIVE) ===
-with tab3:
+@st.fragment
+@traced_tab("habit")
+def tab_habit():
+    df_habit = get_frame("habit")
     nh=st.text_input("Habit Baru")
-    if st.button("Tambah"): sheets["habit"].append_row([str(date.today()), nh, "Belum"]); clear_cache_and_rerun()
+    if st.button("Tambah"): enqueue_append("habit", [str(date.today()), nh, "Belum"]); rerun_tab()
     
     if not df_habit.empty:
+        today = pd.Timestamp(date.today())
+        matrix, first_seen = memo("habit", f"matrix:{today.date()}", lambda: build_habit_matrix(df_habit, today))
+        uh = list(matrix.columns)
+
         # Grafik Habit (Dikembalikan)
-        df_done = df_habit[df_habit['Status'] == 'Done']
-        if not df_done.empty:
-            perf = df_done['Habit'].value_counts().reset_index()
-            perf.columns = ['Habit', 'Total Selesai']
-            with st.expander("📊 Statistik Habit"):
-                st.plotly_chart(px.bar(perf, x='Habit', y='Total Selesai', color='Total Selesai'), use_container_width=True)
-
-        uh=df_habit['Habit'].unique(); today=str(date.today())
+        if st.toggle("📊 Statistik Habit", key="show_habit_chart"):
+            stats = memo("habit", f"stats:{today.date()}", lambda: habit_stats(matrix, first_seen, today))
+            st.dataframe(stats, use_container_width=True)
+            perf = stats['Total Selesai'].reset_index(); perf.columns = ['Habit', 'Total Selesai']
+            st.plotly_chart(px.bar(perf, x='Habit', y='Total Selesai', color='Total Selesai'), use_container_width=True)
+            pick = st.selectbox("Heatmap", ["Semua Habit"] + uh, key="hb_heat")
+            st.plotly_chart(habit_heatmap(matrix, today, None if pick == "Semua Habit" else pick), use_container_width=True)
+
+        done_today = set(matrix.columns[matrix.loc[today]]) if today in matrix.index else set()
         st.write("### ✅ Ceklis Hari Ini")
         with st.container(border=True):
             for h in uh:
-                done=not df_habit[(df_habit['Habit']==h)&(df_habit['Tanggal']==today)&(df_habit['Status']=='Done')].empty
                 c1,c2=st.columns([3,1]); c1.write(f"**{h}**")
-                if done: c2.success("Selesai")
+                if h in done_today: c2.success("Selesai")
                 else: 
-                    if c2.button("Ceklis", key=f"hb_{h}"): sheets["habit"].append_row([today, h, "Done"]); clear_cache_and_rerun()
+                    if c2.button("Ceklis", key=f"hb_{h}"): enqueue_append("habit", [str(date.today()), h, "Done"]); rerun_tab(full=True)
         
         st.write("### ⚙️ Manajemen Habit")
         for h in uh:
             with st.expander(f"Habit: {h}"):
                 if st.button(f"🗑️ Hapus Permanen '{h}'", key=f"del_hab_{h}"):
-                    indices = df_habit[df_habit['Habit'] == h].index
-                    sheets["habit"].delete_rows(indices[-1] + 2)
-                    st.toast(f"Entry {h} dihapus"); time.sleep(0.5); clear_cache_and_rerun()
+                    enqueue_delete("habit", df_habit.loc[df_habit['Habit'] == h, 'ID'].tolist())
+                    st.toast(f"Entry {h} dihapus"); rerun_tab(full=True)
 
 # === TAB 4: JURNAL (VISUAL + ARCHIVE) ===
-with tab4:
+@st.fragment
+@traced_tab("jurnal")
+def tab_jurnal():
+    df_journal = get_frame("journal")
     with st.container(border=True):
         st.subheader("Curhat ke AI")
         curhat = st.text_area("Cerita hari ini...", height=100)
         if st.button("✨ Analisis AI") and model and curhat:
             try:
-                mood = model.generate_content(f"Satu kata emosi (Senang/Sedih/Marah/Netral/Semangat): {curhat}").text.strip()
-                saran = model.generate_content(f"Berikan saran singkat 1 kalimat supportif: {curhat}").text.strip()
-                sheets["journal"].append_row([str(datetime.now()), curhat, mood, saran])
-                st.balloons(); clear_cache_and_rerun()
+                mood, saran = analyze_journal(curhat)
+                enqueue_append("journal", [str(datetime.now()), curhat, mood, saran])
+                st.balloons(); rerun_tab()
             except Exception as e: st.error(f"Error AI: {e}")
 
     if not df_journal.empty:
         # Grafik Mood (Dikembalikan)
         if 'AI_Mood' in df_journal.columns:
             try:
-                mood_map = {"Senang": 5, "Semangat": 5, "Netral": 3, "Biasa": 3, "Lelah": 2, "Sedih": 1, "Marah": 1}
-                df_journal['Score'] = df_journal['AI_Mood'].map(mood_map).fillna(3)
-                df_journal['Waktu'] = pd.to_datetime(df_journal['Tanggal'])
-                with st.expander("📊 Grafik Mood Tracker"):
-                    fig = px.line(df_journal, x='Waktu', y='Score', markers=True, title="Naik Turun Emosi")
+                df_mood = pd.DataFrame({'Waktu': df_journal['Tanggal'], 'Score': df_journal['AI_Mood'].astype(str).map(MOOD_MAP).fillna(3)})
+                if st.toggle("📊 Grafik Mood Tracker", key="show_mood_chart"):
+                    fig = px.line(df_mood, x='Waktu', y='Score', markers=True, title="Naik Turun Emosi")
                     fig.update_yaxes(range=[0, 6], tickvals=[1,3,5], ticktext=["Sedih", "Netral", "Senang"])
                     st.plotly_chart(fig, use_container_width=True)
             except: pass
 
+        with st.expander("🔁 Analisis Ulang Arsip"):
+            only_invalid = st.checkbox("Hanya entri yang mood-nya kosong/tidak valid", value=True)
+            if st.button("Mulai Analisis Ulang") and model:
+                ok, failed = reanalyze_journal(df_journal, only_invalid, st.progress(0.0))
+                st.toast(f"{ok} entri diperbarui" + (f", {failed} gagal" if failed else "")); rerun_tab()
+
+        with st.expander("🔎 Cari Jurnal & Advisor"):
+            c_q, c_mode = st.columns([3, 1])
+            query = c_q.text_input("Kata kunci / cerita mirip", key="search_q")
+            mode = c_mode.radio("Mode", ["similar", "keyword"], format_func=lambda x: "Mirip" if x == "similar" else "Kata kunci", key="search_mode")
+            if query:
+                hits = search_archive(query, 10, mode)
+                if not hits: st.caption("Tidak ada yang cocok.")
+                for score, m in hits:
+                    st.caption(f"{'📔' if m['sheet'] == 'journal' else '🤖'} {m['date']} · skor {score:.2f}")
+                    st.write(f"**{m['title'][:200]}**"); st.caption(m['body'][:300])
+
         st.write("### 📖 20 Jurnal Terakhir")
         recent_journal = df_journal.tail(20)[::-1]
         for i, row in recent_journal.iterrows():
             with st.expander(f"📅 {str(row['Tanggal'])[:10]} | {row.get('AI_Mood','-')}"):
                 st.write(row['Isi_Jurnal'])
                 st.info(f"💡 AI: {row.get('AI_Saran','-')}")
-                if st.button("🗑️ Hapus", key=f"del_j_{i}"):
-                    sheets["journal"].delete_rows(i + 2); st.toast("Terhapus!"); time.sleep(0.5); clear_cache_and_rerun()
+                if st.button("🗑️ Hapus", key=f"del_j_{row['ID']}"):
+                    enqueue_delete("journal", [row["ID"]]); st.toast("Terhapus!"); rerun_tab()
 
         st.divider()
         st.subheader("🗄️ Arsip Cerita (Tahun > Bulan > Hari)")
-        render_archive_system(df_journal, 'Tanggal', 'Isi_Jurnal', 'AI_Mood')
+        if st.toggle("Tampilkan Arsip", key="show_arc_journal"): render_archive_system(df_journal, 'Tanggal', 'Isi_Jurnal', 'AI_Mood', key="journal")
 
 # === TAB 5: ADVISOR (VISUAL + ARCHIVE) ===
-with tab5:
+@st.fragment
+@traced_tab("advisor")
+def tab_advisor():
+    df_advisor = get_frame("advisor")
     st.subheader("Asisten Pribadi")
     
     q = st.chat_input("Tanya...")
     if q and model:
         with st.chat_message("user"): st.write(q)
         with st.chat_message("assistant"):
-            res = model.generate_content(q).text; st.write(res); sheets["advisor"].append_row([str(datetime.now()), q, res]); st.rerun()
+            history = build_advisor_context(df_advisor)
+            recall = build_recall_context(q, len(history) // 2)
+            res = st.write_stream(stream_answer(recall + history + [{"role": "user", "parts": [q]}]))
+            enqueue_append("advisor", [str(datetime.now()), q, res])  # dikirim worker latar, tanpa rerun
 
     st.divider()
     st.subheader("🗄️ Arsip Percakapan (Tahun > Bulan > Hari)")
-    render_archive_system(df_advisor, 'Timestamp', 'Pertanyaan', 'Jawaban')
+    if st.toggle("Tampilkan Arsip", key="show_arc_advisor"): render_archive_system(df_advisor, 'Timestamp', 'Pertanyaan', 'Jawaban', key="advisor")
 
-    if st.button("🔥 Hapus Semua Chat (Reset)"):
-        sheets["advisor"].resize(rows=1); sheets["advisor"].resize(rows=1000); sheets["advisor"].update("A1:C1", [["Timestamp", "Pertanyaan", "Jawaban"]])
-        st.success("Chat bersih!"); time.sleep(1); clear_cache_and_rerun()
+    if st.button("🔥 Hapus Semua Chat (Reset)", disabled=not sheets):
+        wait_for_flush()
+        sheets["advisor"].resize(rows=1); sheets["advisor"].resize(rows=1000); sheets["advisor"].update("A1:D1", [header_for("advisor")])
+        st.success("Chat bersih!"); time.sleep(1); clear_cache_and_rerun("advisor")
 
 # === TAB 6: DATABASE (ADMIN ONLY) ===
-with tab6:
+ADMIN_TABLES = {"ToDo": "todo", "Finance": "fin", "Habit": "habit", "Journal": "journal", "Advisor": "advisor", "Focus": "focus"}
+
+@traced(cat="render")
+def render_admin_table(df, sheet_name, key):
+    if not df.empty:
+        st.dataframe(df, use_container_width=True)
+        st.write(f"**Total Data: {len(df)} Baris**")
+        
+        c_del1, c_del2 = st.columns([3, 1])
+        with c_del1:
+            row_to_del = st.number_input(f"Hapus Baris ID (Index) di {sheet_name}:", min_value=0, max_value=len(df)-1, step=1, key=f"num_{sheet_name}")
+        with c_del2:
+            st.write(""); st.write("")
+            if st.button(f"🗑️ Hapus ID {row_to_del}", key=f"btn_del_{sheet_name}"):
+                enqueue_delete(key, [df.loc[row_to_del, "ID"]])
+                st.toast(f"Baris {row_to_del} dihapus!")
+                rerun_tab(full=True)
+    else:
+        st.info("Tabel Kosong")
+
+def render_trace_panel():
+    """Span per run (Sheets, Gemini, cache, render tab) dari trace terakhir sesi ini."""
+    hist = st.session_state.get("traces", [])[::-1]
+    with st.expander(f"📈 Trace Run ({len(hist)} terakhir)"):
+        if not hist:
+            st.caption("Belum ada trace."); return
+        i = st.selectbox("Run", range(len(hist)), key="trace_pick",
+                         format_func=lambda i: f"{datetime.fromtimestamp(hist[i].started_at):%H:%M:%S} · {hist[i].label} · {hist[i].total_ms:.0f} ms")
+        t = hist[i]
+        summary = pd.DataFrame(t.summary()).T
+        if not summary.empty: st.dataframe(summary.sort_values("total_ms", ascending=False), use_container_width=True)
+        if t.counters: st.caption(" · ".join(f"{k}: {v}" for k, v in sorted(t.counters.items())))
+        if st.toggle("Tampilkan span berurutan", key="trace_raw"):
+            st.dataframe(pd.DataFrame([{"span": "  " * s["depth"] + s["name"], "mulai_ms": round(s["at_ms"], 1), "ms": round(s["ms"], 1),
+                                        **s["meta"]} for s in sorted(t.spans, key=lambda s: s["at_ms"])]), use_container_width=True)
+        st.download_button("⬇️ Export JSONL", "\n".join(x.to_json() for x in hist[::-1]), "traces.jsonl", "application/jsonl")
+
+def render_startup_panel():
+    """Waktu login tampil, login -> dashboard, dan langkah warm-up latar (lihat start_warmup)."""
+    m, w = startup_metrics(), warmup()
+    with st.expander("🚀 Startup"):
+        c1, c2 = st.columns(2)
+        c1.metric("Login tampil", f"{m['first_paint_ms']:.0f} ms" if "first_paint_ms" in m else "-")
+        c2.metric("Login → dashboard", f"{m['dashboard_ms']:.0f} ms" if "dashboard_ms" in m else "-")
+        st.caption("Warm-up: " + (" · ".join(f"{k} {v:.0f} ms" for k, v in w["ms"].items()) or "-")
+                   + ("" if w["done"].is_set() else " (masih jalan)"))
+        if w["error"]: st.caption(f"⚠️ {w['error']}")
+        if model:
+            cool = model.status()
+            st.caption("Model Gemini: " + " → ".join(n + (f" (rate limit, {cool[n]} dtk)" if n in cool else "") for n in model.names)
+                       + ("" if ranked_models() else " · belum ada ranking, jalankan cek_model.py"))
+
+@st.fragment
+@traced_tab("database")
+def tab_database():
     st.header("🗄️ Database Center (Admin)")
     st.warning("Hati-hati! Tab ini menampilkan data mentah. Menghapus data di sini bersifat permanen.")
+
+    last_sync = get_sync_store().get("last_sync")
+    if last_sync:
+        with st.expander(f"⏱️ Sync Terakhir ({last_sync['at']}, {last_sync['requests']} request)"):
+            st.dataframe(pd.DataFrame(last_sync["sheets"]).T, use_container_width=True)
+            gs = get_sheets_gateway().stats
+            st.caption(f"Gateway: {gs['calls']} request, {gs['retries']} retry, {gs['coalesced']} baca digabung, antre limiter {gs['throttled_s']:.1f} dtk")
+
+    render_trace_panel()
+    render_startup_panel()
     
-    tab_db1, tab_db2, tab_db3, tab_db4, tab_db5 = st.tabs(["ToDo", "Finance", "Habit", "Journal", "Advisor"])
-    
-    def render_admin_table(df, sheet_name, sheet_obj):
-        if not df.empty:
-            st.dataframe(df, use_container_width=True)
-            st.write(f"**Total Data: {len(df)} Baris**")
-            
-            c_del1, c_del2 = st.columns([3, 1])
-            with c_del1:
-                row_to_del = st.number_input(f"Hapus Baris ID (Index) di {sheet_name}:", min_value=0, max_value=len(df)-1, step=1, key=f"num_{sheet_name}")
-            with c_del2:
-                st.write(""); st.write("")
-                if st.button(f"🗑️ Hapus ID {row_to_del}", key=f"btn_del_{sheet_name}"):
-                    sheet_obj.delete_rows(row_to_del + 2)
-                    st.success(f"Baris {row_to_del} dihapus!")
-                    time.sleep(1)
-                    clear_cache_and_rerun()
-        else:
-            st.info("Tabel Kosong")
+    # Hanya tabel yang dipilih yang dirender
+    name = st.radio("Tabel", list(ADMIN_TABLES), horizontal=True, key="db_table")
+    render_admin_table(get_frame(ADMIN_TABLES[name]), name, ADMIN_TABLES[name])
 
-    with tab_db1: render_admin_table(df_todo, "ToDo", sheets["todo"])
-    with tab_db2: render_admin_table(df_fin, "Finance", sheets["fin"])
-    with tab_db3: render_admin_table(df_habit, "Habit", sheets["habit"])
-    with tab_db4: render_admin_table(df_journal, "Journal", sheets["journal"])
-    with tab_db5: render_admin_table(df_advisor, "Advisor", sheets["advisor"])
\ No newline at end of file
+TABS = {"🏠 Home": tab_home, "📝 ToDo": tab_todo, "💰 Uang": tab_uang, "✅ Habit": tab_habit,
+        "📔 Jurnal": tab_jurnal, "🤖 Advisor": tab_advisor, "🗄️ Database": tab_database}
+active_tab = st.radio("Menu", list(TABS), horizontal=True, label_visibility="collapsed", key="nav")
+TABS[active_tab]()
+if "login_at" in st.session_state: startup_metrics()["dashboard_ms"] = (time.perf_counter() - st.session_state.pop("login_at")) * 1000
+keep_trace(tracing.detach()); st.session_state.pop("trace_open", None)
@@ -0,0 +1,233 @@
+"""
+Pengganti offline untuk gspread dan Gemini, khusus benchmark (tanpa kredensial Google).
+
+FakeClient/FakeSpreadsheet/FakeWorksheet meniru method gspread yang dipakai app.py (values_batch_get,
+batch_update, append_rows, update, resize, ...) plus API lama (get_all_records, update_cell,
+delete_rows) dengan latensi per request yang bisa diatur. FakeModel meniru GenerativeModel
+(JSON mode, streaming, usage_metadata). `make_history(n)` membuat n baris per sheet.
+`install` tidak mengimpor gspread/genai sendiri: modul yang belum diimpor dipatch saat app mengimpornya,
+jadi pengukuran cold start tetap jujur.
+"""
+import importlib.abc
+import importlib.util
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+LATENCY = {"sheets": 0.0, "gemini": 0.0, "gemini_token": 0.0}  # detik per request / per chunk stream
+CALLS = []
+
+
+def _call(kind, name):
+    CALLS.append((kind, name))
+    if LATENCY[kind]: time.sleep(LATENCY[kind])
+
+
+class FakeWorksheet:
+    def __init__(self, sh, title, rows, wid):
+        self.spreadsheet, self.title, self.id = sh, title, wid
+        self._v = [list(r) for r in rows]
+
+    @property
+    def row_count(self): return max(1000, len(self._v))
+
+    @property
+    def col_count(self): return max([len(r) for r in self._v] + [1])
+
+    def _rng(self, a1):
+        from gspread.utils import a1_range_to_grid_range
+        g = a1_range_to_grid_range(a1.split("!")[-1].replace("'", ""))
+        return g.get("startRowIndex", 0), g.get("endRowIndex", len(self._v)), g.get("startColumnIndex", 0), g.get("endColumnIndex", 10 ** 6)
+
+    def _get(self, a1):
+        if "!" not in a1: a1 = "A1:ZZ1000000"  # nama tab saja = seluruh sheet
+        r0, r1, c0, c1 = self._rng(a1)
+        out = [[str(c) for c in r[c0:c1]] for r in self._v[r0:r1]]
+        while out and not any(out[-1]): out.pop()
+        return out
+
+    def _set(self, r, c, val):
+        while len(self._v) < r: self._v.append([])
+        row = self._v[r - 1]
+        while len(row) < c: row.append("")
+        row[c - 1] = val
+
+    def _upd(self, a1, values):
+        r0, _, c0, _ = self._rng(a1)
+        for i, row in enumerate(values):
+            for j, v in enumerate(row): self._set(r0 + i + 1, c0 + j + 1, v)
+
+    # --- API gspread ---
+    def get_all_values(self, **k):
+        _call("sheets", "get_all_values"); w = self.col_count
+        return [[str(c) for c in r] + [""] * (w - len(r)) for r in self._v]
+
+    def get_all_records(self, **k):
+        _call("sheets", "get_all_records")
+        if not self._v: return []
+        h = self._v[0]
+        return [dict(zip(h, list(r) + [""] * (len(h) - len(r)))) for r in self._v[1:]]
+
+    def col_values(self, col, **k):
+        _call("sheets", "col_values")
+        return [str(r[col - 1]) if len(r) >= col else "" for r in self._v]
+
+    def append_row(self, row, **k): _call("sheets", "append_row"); self._v.append(list(row))
+    def append_rows(self, rows, **k): _call("sheets", "append_rows"); self._v.extend(list(r) for r in rows)
+    def update_cell(self, r, c, val): _call("sheets", "update_cell"); self._set(r, c, val)
+
+    def update(self, range_name=None, values=None, **k):
+        _call("sheets", "update")
+        if isinstance(range_name, list): range_name, values = values, range_name  # urutan argumen gspread 5
+        self._upd(range_name, values)
+
+    def delete_rows(self, start, end=None):
+        _call("sheets", "delete_rows"); del self._v[start - 1:(end or start)]
+
+    def resize(self, rows=None, cols=None):
+        _call("sheets", "resize")
+        if rows is not None: del self._v[rows:]
+
+
+class FakeSpreadsheet:
+    id = "bench-sheet"
+
+    def __init__(self, data):
+        self._ws = {t: FakeWorksheet(self, t, rows, i) for i, (t, rows) in enumerate(data.items())}
+
+    def worksheet(self, title):
+        _call("sheets", "worksheet")
+        if title not in self._ws:
+            import gspread
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._ws[title]
+
+    def worksheets(self, **k): _call("sheets", "worksheets"); return list(self._ws.values())
+
+    def add_worksheet(self, title, rows=100, cols=10, **k):
+        _call("sheets", "add_worksheet")
+        ws = self._ws[title] = FakeWorksheet(self, title, [], len(self._ws))
+        return ws
+
+    def values_batch_get(self, ranges, params=None, **k):
+        _call("sheets", "values_batch_get"); out = []
+        for r in ranges:
+            vals = self._ws[r.split("!")[0].strip("'")]._get(r)
+            out.append({"range": r, "values": vals} if vals else {"range": r})
+        return {"valueRanges": out}
+
+    def batch_update(self, body, **k):
+        _call("sheets", "batch_update")
+        by_id = {w.id: w for w in self._ws.values()}
+        for req in body["requests"]:
+            if "updateCells" in req:
+                u = req["updateCells"]; w = by_id[u["start"]["sheetId"]]
+                for i, row in enumerate(u["rows"]):
+                    for j, cell in enumerate(row["values"]):
+                        w._set(u["start"]["rowIndex"] + i + 1, u["start"]["columnIndex"] + j + 1, next(iter(cell["userEnteredValue"].values())))
+            elif "deleteDimension" in req:
+                r = req["deleteDimension"]["range"]
+                del by_id[r["sheetId"]]._v[r["startIndex"]:r["endIndex"]]
+        return {}
+
+
+class FakeClient:
+    def __init__(self, sh): self.sh = sh
+    def open(self, name): _call("sheets", "open"); return self.sh
+
+
+# --- Gemini ---
+class _Usage:
+    def __init__(self, prompt, output): self.prompt_token_count, self.candidates_token_count = prompt, output
+
+
+class FakeResponse:
+    def __init__(self, text, usage=None): self.text, self.usage_metadata = text, usage
+
+
+class FakeModel:
+    def __init__(self, *a, **k): pass
+
+    def generate_content(self, contents, stream=False, generation_config=None, **k):
+        _call("gemini", "generate_content")
+        usage = _Usage(len(json.dumps(contents, default=str)) // 4, 40)
+        if generation_config:
+            res = FakeResponse('{"mood": "Senang", "saran": "Tetap semangat!"}', usage)
+            return iter([res]) if stream else res
+        words = ("Coba sisihkan sebagian pemasukan di awal bulan lalu catat pengeluaran harian. " * 3).split()
+        if not stream: return FakeResponse(" ".join(words), usage)
+        return self._stream(words, usage)
+
+    def _stream(self, words, usage):
+        for i in range(0, len(words), 4):
+            if LATENCY["gemini_token"]: time.sleep(LATENCY["gemini_token"])
+            yield FakeResponse(" ".join(words[i:i + 4]) + " ", usage if i + 4 >= len(words) else None)
+
+
+# --- data sintetis ---
+HEADERS = {
+    "todos": ["Tanggal", "Task", "Prioritas", "Status", "ID"],
+    "finance": ["Tanggal", "Item", "Kategori", "Jumlah", "Tipe", "ID"],
+    "habits": ["Tanggal", "Habit", "Status", "ID"],
+    "journal": ["Tanggal", "Isi_Jurnal", "AI_Mood", "AI_Saran", "ID"],
+    "advisor": ["Timestamp", "Pertanyaan", "Jawaban", "ID"],
+    "focus": ["Tanggal", "Menit", "ID"],
+}
+WORDS = "hari ini kerja belajar python capek senang rapat olahraga makan uang hemat tidur baca lari keluarga".split()
+
+
+def make_history(n, seed=1, days=3 * 365, pending_days=30, with_ids=True):
+    """
+    n baris per sheet, tersebar di `days` hari terakhir (urut waktu, seperti data append asli).
+    Task lebih tua dari `pending_days` dianggap sudah selesai, seperti riwayat sungguhan.
+    """
+    rnd = random.Random(seed)
+    end = datetime.now().replace(microsecond=0)
+    stamps = sorted(end - timedelta(seconds=rnd.randrange(days * 86400)) for _ in range(n))
+    text = lambda k: " ".join(rnd.choice(WORDS) for _ in range(k))
+    rows = {t: [list(h if with_ids else h[:-1])] for t, h in HEADERS.items()}
+    for i, ts in enumerate(stamps):
+        t = ts.strftime("%Y-%m-%d %H:%M:%S.%f")
+        data = {
+            "todos": [t, f"task {text(4)}", rnd.choice(["Tinggi", "Sedang", "Rendah"]),
+                      rnd.choice(["Pending", "Selesai"]) if (end - ts).days < pending_days else "Selesai"],
+            "finance": [t, f"item {text(2)}", rnd.choice(["Makan", "Transport", "Belanja", "Tagihan", "Hiburan"]),
+                        rnd.randint(1, 200) * 1000, rnd.choice(["Pengeluaran"] * 4 + ["Pemasukan"])],
+            "habits": [ts.strftime("%Y-%m-%d"), rnd.choice(["Lari", "Baca", "Meditasi", "Minum Air"]), rnd.choice(["Done", "Done", "Belum"])],
+            "journal": [t, text(30), rnd.choice(["Senang", "Sedih", "Marah", "Cemas", "Netral", "Semangat"]), text(10)],
+            "advisor": [t, f"{text(8)}?", text(60)],
+            "focus": [t, rnd.choice([15, 25, 25, 50])],
+        }
+        for title, row in data.items():
+            rows[title].append(row + ([f"b{title[:2]}{i:07d}"] if with_ids else []))
+    return rows
+
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    """Jalankan patch tepat setelah modul tertentu selesai diimpor (oleh app, di thread mana pun)."""
+
+    def __init__(self, patches): self.patches = patches
+
+    def find_spec(self, name, path, target=None):
+        if name not in self.patches: return None
+        sys.meta_path.remove(self)
+        try: spec = importlib.util.find_spec(name)
+        finally: sys.meta_path.insert(0, self)
+        exec_module, patch = spec.loader.exec_module, self.patches.pop(name)
+        def run(module): exec_module(module); patch(module)
+        spec.loader.exec_module = run
+        return spec
+
+
+def install(data):
+    """Pasang fake ke gspread / oauth2client / google.generativeai; kembalikan spreadsheet-nya."""
+    sh = FakeSpreadsheet(data)
+    def creds(m): m.ServiceAccountCredentials.from_json_keyfile_dict = staticmethod(lambda info, scope: object())
+    def gemini(m): m.configure = lambda **k: None; m.GenerativeModel = FakeModel
+    patches = {"gspread": lambda m: setattr(m, "authorize", lambda c: FakeClient(sh)),
+               "oauth2client.service_account": creds, "google.generativeai": gemini}
+    for name in [n for n in patches if n in sys.modules]: patches.pop(name)(sys.modules[name])
+    if patches: sys.meta_path.insert(0, _PatchOnImport(patches))
+    return sh
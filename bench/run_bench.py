@@ -0,0 +1,158 @@
+"""
+Benchmark app.py tanpa kredensial Google: app dijalankan headless lewat Streamlit AppTest dengan
+gspread/Gemini palsu (bench/fakes.py) dan riwayat sintetis per ukuran.
+
+    python bench/run_bench.py                                  # 1k, 10k, 100k baris per sheet
+    python bench/run_bench.py --sizes 1000,10000 --sheets-latency 0.15 --json hasil.json
+    python bench/run_bench.py --baseline hasil.json            # bandingkan dengan hasil lama
+
+Yang diukur per ukuran: layar login tampil (proses baru, modul berat belum diimpor), cold load
+(klik login -> dashboard, setelah jeda mengetik password), latensi rerun tiap tab, render arsip
+(dari span tracing `archive.<key>`), peak memory Python saat cold load (tracemalloc) dan peak RSS proses.
+Tiap ukuran jalan di subprocess sendiri supaya cache_resource & thread latar tidak terbawa.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(os.path.dirname(HERE), "app.py")
+MARKER = "BENCH_RESULT "
+RERUNS = 3
+ARCHIVES = {"todo": "📝 ToDo", "fin": "💰 Uang", "journal": "📔 Jurnal", "advisor": "🤖 Advisor"}
+
+
+def _timed(fn):
+    t0 = time.perf_counter(); fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def _peak_rss_mb():
+    """Peak RSS seluruh proses (termasuk data sintetis & Streamlit); None di Windows."""
+    try: import resource
+    except ImportError: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10  # macOS: byte, Linux: KB
+
+
+def _check(at, what):
+    if at.exception: raise RuntimeError(f"{what}: {at.exception[0].message}")
+
+
+def run_size(n, args):
+    """Satu ukuran data di proses ini; mengembalikan dict hasil."""
+    sys.path.insert(0, HERE)
+    sys.path.insert(0, os.path.dirname(APP))  # seperti `streamlit run`; AppTest hanya memasangnya selama run
+    import fakes
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(tempfile.mkdtemp(prefix="lifeos-bench-"))  # mirror SQLite baru, tidak mengotori repo
+    fakes.LATENCY.update(sheets=args.sheets_latency, gemini=args.gemini_latency, gemini_token=args.gemini_token_latency)
+    t0 = time.perf_counter(); fakes.install(fakes.make_history(n)); gen_ms = (time.perf_counter() - t0) * 1000
+
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.secrets["APP_PASSWORD"] = "bench"; at.secrets["GCP_SERVICE_ACCOUNT"] = "{}"; at.secrets["GEMINI_API_KEY"] = "bench"
+
+    paint_ms = _timed(at.run); _check(at, "layar login")
+    time.sleep(args.typing)  # warm-up app jalan di latar selama user mengetik
+    at.text_input[0].input("bench")
+    if args.tracemalloc: tracemalloc.start()  # hanya saat cold load: tracemalloc memperlambat run beberapa kali lipat
+    cold_ms = _timed(lambda: at.button[0].click().run()); _check(at, "cold load")
+    cold_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+    tracemalloc.stop()
+    cold_calls = len(fakes.CALLS)
+
+    tabs = {}
+    for label in at.radio(key="nav").options:
+        switch_ms = _timed(lambda: at.radio(key="nav").set_value(label).run()); _check(at, label)
+        reruns = [_timed(at.run) for _ in range(RERUNS)]; _check(at, label)
+        tabs[label] = {"switch_ms": switch_ms, "rerun_ms": statistics.median(reruns)}
+
+    archives = {}
+    for key, label in ARCHIVES.items():
+        at.radio(key="nav").set_value(label).run()
+        run_ms = _timed(lambda: at.toggle(key=f"show_arc_{key}").set_value(True).run()); _check(at, f"arsip {key}")
+        span = at.session_state["traces"][-1].summary().get(f"archive.{key}", {})
+        archives[key] = {"run_ms": run_ms, "render_ms": span.get("total_ms")}
+        at.toggle(key=f"show_arc_{key}").set_value(False).run()
+
+    return {"rows_per_sheet": n, "generate_ms": gen_ms, "first_paint_ms": paint_ms, "cold_load_ms": cold_ms, "cold_peak_mb": cold_peak and cold_peak / 2 ** 20,
+            "cold_sheets_calls": cold_calls, "peak_rss_mb": _peak_rss_mb(), "tabs": tabs, "archives": archives}
+
+
+def _spawn(n, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(n), "--timeout", str(args.timeout),
+           "--sheets-latency", str(args.sheets_latency), "--gemini-latency", str(args.gemini_latency),
+           "--gemini-token-latency", str(args.gemini_token_latency), "--typing", str(args.typing)] + ([] if args.tracemalloc else ["--no-tracemalloc"])
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith(MARKER)]
+    if proc.returncode or not lines:
+        raise RuntimeError(f"benchmark {n} baris gagal:\n{proc.stderr[-3000:]}")
+    return json.loads(lines[-1][len(MARKER):])
+
+
+def _fmt(v, base=None):
+    if v is None: return "-"
+    s = f"{v:,.0f}" if v >= 100 else f"{v:,.1f}"
+    if base: s += f" ({(v - base) / base * 100:+.0f}%)"
+    return s
+
+
+def report(results, baseline=None):
+    base = {r["rows_per_sheet"]: r for r in (baseline or {}).get("results", [])}
+    for r in results:
+        b = base.get(r["rows_per_sheet"], {})
+        print(f"\n=== {r['rows_per_sheet']:,} baris/sheet ===")
+        print(f"login tampil   : {_fmt(r.get('first_paint_ms'), b.get('first_paint_ms'))} ms")
+        print(f"cold load      : {_fmt(r['cold_load_ms'], b.get('cold_load_ms'))} ms klik login -> dashboard  ({r['cold_sheets_calls']} panggilan Sheets)")
+        print(f"peak memory    : {_fmt(r['cold_peak_mb'], b.get('cold_peak_mb'))} MB Python saat cold load (tracemalloc), "
+              f"{_fmt(r['peak_rss_mb'], b.get('peak_rss_mb'))} MB RSS proses")
+        print(f"{'tab':<14} {'pindah (ms)':>18} {'rerun (ms)':>18}")
+        for label, t in r["tabs"].items():
+            bt = b.get("tabs", {}).get(label, {})
+            print(f"{label:<14} {_fmt(t['switch_ms'], bt.get('switch_ms')):>18} {_fmt(t['rerun_ms'], bt.get('rerun_ms')):>18}")
+        print(f"{'arsip':<14} {'run (ms)':>18} {'render (ms)':>18}")
+        for key, a in r["archives"].items():
+            ba = b.get("archives", {}).get(key, {})
+            print(f"{key:<14} {_fmt(a['run_ms'], ba.get('run_ms')):>18} {_fmt(a['render_ms'], ba.get('render_ms')):>18}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sizes", default="1000,10000,100000", help="jumlah baris per sheet, dipisah koma")
+    p.add_argument("--sheets-latency", type=float, default=0.0, help="detik per request Sheets palsu")
+    p.add_argument("--gemini-latency", type=float, default=0.0, help="detik per panggilan Gemini palsu")
+    p.add_argument("--gemini-token-latency", type=float, default=0.0, help="detik per chunk stream Gemini")
+    p.add_argument("--typing", type=float, default=2.0, help="detik jeda mengetik password sebelum klik login")
+    p.add_argument("--timeout", type=float, default=600, help="batas detik per run AppTest")
+    p.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                   help="lewati pengukuran memori Python (cold load jadi tidak ikut melambat)")
+    p.add_argument("--json", help="simpan hasil ke file JSON (untuk baseline)")
+    p.add_argument("--baseline", help="file JSON hasil lama untuk dibandingkan")
+    p.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.worker:
+        print(MARKER + json.dumps(run_size(args.worker, args)), flush=True)
+        return
+
+    results = []
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        print(f"menjalankan {n:,} baris/sheet ...", file=sys.stderr, flush=True)
+        results.append(_spawn(n, args))
+    baseline = json.load(open(args.baseline, encoding="utf-8")) if args.baseline else None
+    report(results, baseline)
+    if args.json:
+        meta = {k: getattr(args, k) for k in ("sheets_latency", "gemini_latency", "gemini_token_latency", "typing", "tracemalloc")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "config": meta, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
 import google.generativeai as genai
+from datetime import datetime
+from model_ranking import PROBE_CASES, RANKING_PATH, probe, save_ranking, load_ranking
 
 st.set_page_config(page_title="Cek Model Gemini", layout="centered")
 
@@ -19,6 +21,10 @@ except Exception as e:
     st.error(f"Error membaca secrets: {e}")
     st.stop()
 
+def text_models():
+    # Kita hanya cari model yang bisa generate text (generateContent)
+    return [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+
 # 2. Tanya Google: Model apa yang tersedia?
 if st.button("🔍 Cek Daftar Model Sekarang"):
     st.write("---")
@@ -26,14 +32,11 @@ if st.button("🔍 Cek Daftar Model Sekarang"):
     
     try:
         # Ini perintah untuk melist semua model yang tersedia buat akun Anda
-        found_any = False
-        for m in genai.list_models():
-            # Kita hanya cari model yang bisa generate text (generateContent)
-            if 'generateContent' in m.supported_generation_methods:
-                st.code(m.name) # Tampilkan nama modelnya
-                found_any = True
+        names = text_models()
+        for name in names:
+            st.code(name) # Tampilkan nama modelnya
         
-        if not found_any:
+        if not names:
             st.warning("Aneh... Tidak ada model text yang ditemukan. Akun mungkin belum aktif?")
             
     except Exception as e:
@@ -52,4 +55,39 @@ if st.button("Kirim Pesan 'Halo'"):
         st.success("✅ BERHASIL BALAS!")
         st.write(f"Jawabannya: {response.text}")
     except Exception as e:
-        st.error(f"❌ Gagal pakai model ini: {e}")
\ No newline at end of file
+        st.error(f"❌ Gagal pakai model ini: {e}")
+
+# 4. Balapan: ukur semua model sekaligus, hasilnya dipakai app.py (model tercepat + cadangan)
+st.write("---")
+st.write("### 🏁 Balapan Model (Kecepatan & Kesehatan)")
+st.caption(f"{len(PROBE_CASES)} bentuk request app (teks, JSON, percakapan) × beberapa putaran per model, paralel. "
+           f"Ranking disimpan ke `{RANKING_PATH}` dan dibaca app.py saat memilih model.")
+
+def show_ranking(data):
+    st.caption(f"Ranking dibuat {datetime.fromtimestamp(data['created_at']):%Y-%m-%d %H:%M:%S}")
+    st.dataframe([{"model": m["name"], "sehat": "✅" if m["healthy"] else "❌",
+                   "TTFT (ms)": m["ttft_ms"] and round(m["ttft_ms"]), "latensi (ms)": m["latency_ms"] and round(m["latency_ms"]),
+                   "token/dtk": m["tokens_per_s"] and round(m["tokens_per_s"], 1), "error": f"{m['error_rate']:.0%}",
+                   "kasus gagal": ", ".join(m.get("failed_cases", [])), "error terakhir": m["last_error"] or ""} for m in data["models"]], use_container_width=True)
+
+c1, c2 = st.columns(2)
+runs = c1.number_input("Putaran per kasus", 1, 10, 2)
+concurrency = c2.number_input("Request paralel", 1, 32, 8)
+
+if st.button("🏁 Ukur Semua Model"):
+    try:
+        names = text_models()
+    except Exception as e:
+        st.error(f"❌ Gagal mengambil daftar model: {e}"); st.stop()
+    bar = st.progress(0.0, text=f"Mengukur {len(names)} model...")
+    stats = probe(names, lambda n: genai.GenerativeModel(n), runs=int(runs), concurrency=int(concurrency),
+                  on_result=lambda done, total: bar.progress(done / total, text=f"{done}/{total} request"))
+    bar.empty()
+    data = save_ranking(stats, runs=int(runs), concurrency=int(concurrency), cases=[c["name"] for c in PROBE_CASES])
+    best = [m["name"] for m in stats if m["healthy"]]
+    if best: st.success(f"✅ Tercepat & sehat: {best[0]}")
+    else: st.warning("Tidak ada model yang sehat. Cek kuota / API Key; app.py tetap memakai model default.")
+    show_ranking(data)
+else:
+    cached = load_ranking()
+    if cached: show_ranking(cached)
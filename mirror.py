@@ -0,0 +1,87 @@
+"""
+Mirror lokal (SQLite) dari spreadsheet productivity_db.
+
+Menyimpan baris mentah tiap tab (string, persis seperti dari Sheets) plus outbox mutasi yang
+belum terkirim, supaya app bisa start dan tetap jalan (baca + antre tulis) tanpa jaringan.
+Google Sheets jadi target sinkronisasi; rekonsiliasi dua arah dijalankan dari app.py.
+Urutan baris = urutan `seq`; kolom ID diindeks, jadi edit/hapus dari UI hanya menyentuh baris
+ber-ID itu (`update_cell`, `delete`), sedangkan hasil sync ditulis ulang dari posisi pertama
+yang berubah (`save`).
+"""
+import json
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 2  # 1: baris dikunci posisi (pos)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS sheets (key TEXT PRIMARY KEY, header TEXT NOT NULL, full_at REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS rows (seq INTEGER PRIMARY KEY, key TEXT NOT NULL, id TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS rows_by_key ON rows (key);
+CREATE INDEX IF NOT EXISTS rows_by_id ON rows (key, id);
+CREATE TABLE IF NOT EXISTS outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL);
+"""
+
+
+class Mirror:
+    def __init__(self, path, id_col):
+        self.id_col = id_col
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # format lama: buang salinan baris, outbox dipertahankan. Tab tanpa salinan tetap ditarik
+            # dari Sheets walau ada op antrean, lalu op itu diterapkan ulang (sync_all di app.py).
+            self.db.executescript("DROP TABLE IF EXISTS rows; DROP TABLE IF EXISTS sheets;")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(_DDL)
+        self.lock = threading.Lock()
+
+    def _tx(self, statements):
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                for sql, args in statements:
+                    (self.db.executemany if isinstance(args, list) else self.db.execute)(sql, args)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK"); raise
+
+    # --- tabel ---
+    def load(self, key):
+        """{"header", "rows", "full_at"} dari disk, atau None kalau tab belum pernah disimpan."""
+        with self.lock:
+            meta = self.db.execute("SELECT header, full_at FROM sheets WHERE key = ?", (key,)).fetchone()
+            if not meta: return None
+            rows = [json.loads(d) for (d,) in self.db.execute("SELECT data FROM rows WHERE key = ? ORDER BY seq", (key,))]
+        return {"header": json.loads(meta[0]), "rows": rows, "full_at": meta[1]}
+
+    def save(self, key, header, rows, start=0, full_at=0):
+        """Tulis ulang baris ke-`start` dst. (baris sebelumnya tidak berubah) dalam satu transaksi."""
+        ic = header.index(self.id_col) if self.id_col in header else None
+        params = [(key, r[ic] if ic is not None else None, json.dumps(r)) for r in rows[start:]]
+        self._tx([
+            ("INSERT OR REPLACE INTO sheets (key, header, full_at) VALUES (?, ?, ?)", (key, json.dumps(header), full_at)),
+            ("DELETE FROM rows WHERE key = ? AND seq >= (SELECT seq FROM rows WHERE key = ? ORDER BY seq LIMIT 1 OFFSET ?)", (key, key, start)),
+            ("INSERT INTO rows (key, id, data) VALUES (?, ?, ?)", params),
+        ])
+
+    def update_cell(self, key, rid, col, value):
+        """Ubah satu kolom (indeks) di semua baris ber-ID `rid`."""
+        self._tx([("UPDATE rows SET data = json_set(data, ?, ?) WHERE key = ? AND id = ?", (f"$[{col}]", value, key, rid))])
+
+    def delete(self, key, ids):
+        self._tx([("DELETE FROM rows WHERE key = ? AND id = ?", [(key, i) for i in ids])])
+
+    # --- outbox (antrean tulis yang belum sampai ke Sheets) ---
+    def outbox_add(self, op):
+        with self.lock:
+            return self.db.execute("INSERT INTO outbox (op) VALUES (?)", (json.dumps(op),)).lastrowid
+
+    def outbox_remove(self, seqs):
+        with self.lock:
+            self.db.executemany("DELETE FROM outbox WHERE seq = ?", [(s,) for s in seqs])
+
+    def outbox(self):
+        with self.lock:
+            return [dict(json.loads(op), seq=seq) for seq, op in self.db.execute("SELECT seq, op FROM outbox ORDER BY seq")]
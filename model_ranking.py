@@ -0,0 +1,181 @@
+"""
+Ranking kecepatan model Gemini (dibuat cek_model.py, dibaca app.py).
+
+`probe` mengukur tiap model secara paralel dengan bentuk request yang sama seperti app.py (teks
+biasa, mode JSON, percakapan multi-giliran): time-to-first-token, latensi total, token/detik dan
+error rate. Hasilnya disimpan ke RANKING_PATH beserta timestamp. `FallbackModel` membungkus
+beberapa GenerativeModel sesuai urutan ranking dan pindah ke model berikutnya kalau model utama
+kena rate limit, sudah tidak ada (404) atau menolak bentuk request-nya (400). Modul ini tidak bergantung pada Streamlit maupun
+google.generativeai (model dibuat lewat factory dari pemanggil).
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tracing import count
+
+RANKING_PATH = "model_ranking.json"  # di-.gitignore
+RANKING_MAX_AGE = 7 * 86400          # detik; ranking lebih tua dianggap basi
+MAX_ERROR_RATE = 0.2                 # di atas ini model dianggap tidak sehat
+RATE_LIMIT_CODES = {429, 503}        # 503 = "model is overloaded", sama-sama soal kapasitas
+UNSUPPORTED_CODES = {400, 404}       # InvalidArgument (mis. mode JSON tak didukung), NotFound
+FALLBACK_COOLDOWN = 60               # detik model dilewati setelah kena rate limit / 404
+
+# Bentuk request yang dikirim app.py: teks biasa (stream), analisis jurnal (mode JSON),
+# Advisor (riwayat multi-giliran, stream). Model sehat hanya kalau semua kasus pernah berhasil.
+PROBE_CASES = [
+    {"name": "teks", "contents": "Beri 3 tips singkat menghemat uang jajan bulanan."},
+    {"name": "json", "json": True,
+     "contents": 'Analisis jurnal berikut. Balas HANYA JSON dengan format {"mood": "<satu kata>", "saran": "<1 kalimat>"}.'
+                 "\n\nJurnal: hari ini capek tapi senang.",
+     "generation_config": {"response_mime_type": "application/json"}},
+    {"name": "chat", "contents": [
+        {"role": "user", "parts": ["Aku mau nabung buat beli laptop."]},
+        {"role": "model", "parts": ["Bagus! Berapa target dan kapan mau dibeli?"]},
+        {"role": "user", "parts": ["5 juta, 6 bulan lagi. Sebulan harus nabung berapa?"]}]},
+]
+
+
+def is_rate_limited(exc):
+    """429/503 dari google.api_core (atribut `code`), tanpa perlu mengimpor modulnya."""
+    return getattr(exc, "code", None) in RATE_LIMIT_CODES
+
+
+def is_unsupported(exc):
+    """400/404: model tidak ada lagi atau tidak menerima bentuk request ini."""
+    return getattr(exc, "code", None) in UNSUPPORTED_CODES
+
+
+# --- probe ---
+def _error(case, e):
+    return {"ok": False, "case": case["name"], "error": f"{type(e).__name__}: {e}"[:300], "rate_limited": is_rate_limited(e)}
+
+
+def probe_once(model, case):
+    """Satu request streaming; dict hasil (ok, ttft_ms, latency_ms, output_tokens, tokens_per_s) atau error."""
+    kwargs = {"generation_config": case["generation_config"]} if "generation_config" in case else {}
+    t0, ttft, usage, text = time.perf_counter(), None, None, []
+    try:
+        for chunk in model.generate_content(case["contents"], stream=True, **kwargs):
+            if ttft is None: ttft = time.perf_counter() - t0
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            try: text.append(chunk.text)
+            except ValueError: pass  # chunk tanpa teks
+        if case.get("json") and not isinstance(json.loads("".join(text)), dict):
+            raise ValueError("balasan JSON bukan objek")
+    except Exception as e:
+        return _error(case, e)
+    total = time.perf_counter() - t0
+    tokens = getattr(usage, "candidates_token_count", None) or 0
+    return {"ok": True, "case": case["name"], "ttft_ms": (ttft or total) * 1000, "latency_ms": total * 1000,
+            "output_tokens": tokens, "tokens_per_s": tokens / total if total else 0.0}
+
+
+def _median(rows, key):
+    vals = [r[key] for r in rows if r.get("ok")]
+    return statistics.median(vals) if vals else None
+
+
+def summarize(name, results):
+    ok = [r for r in results if r["ok"]]
+    errors = [r for r in results if not r["ok"]]
+    rate = len(errors) / len(results) if results else 1.0
+    failed = sorted({r["case"] for r in errors} - {r["case"] for r in ok})  # kasus yang tidak pernah berhasil
+    return {"name": name, "healthy": bool(ok) and rate <= MAX_ERROR_RATE and not failed, "runs": len(results),
+            "errors": len(errors), "error_rate": rate, "failed_cases": failed, "rate_limited": sum(r["rate_limited"] for r in errors),
+            "ttft_ms": _median(ok, "ttft_ms"), "latency_ms": _median(ok, "latency_ms"),
+            "tokens_per_s": _median(ok, "tokens_per_s"), "last_error": errors[-1]["error"] if errors else None}
+
+
+def rank(stats):
+    """Sehat dulu, lalu median latensi total tercepat (seri -> TTFT)."""
+    inf = float("inf")
+    return sorted(stats, key=lambda s: (not s["healthy"], s["latency_ms"] or inf, s["ttft_ms"] or inf))
+
+
+def probe(names, make_model, cases=PROBE_CASES, runs=2, concurrency=8, on_result=None):
+    """
+    Ukur semua model sekaligus (names x cases x runs request, paralel dibatasi `concurrency`).
+    `make_model(name)` membuat GenerativeModel; `on_result(done, total)` dipanggil di thread pemanggil.
+    Mengembalikan ringkasan per model, sudah diurutkan `rank`.
+    """
+    models, results = {}, {n: [] for n in names}
+    for n in names:
+        try: models[n] = make_model(n)
+        except Exception as e: results[n].append(_error({"name": "init"}, e))
+    jobs = [(n, c) for n in models for c in cases for _ in range(runs)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futs = {pool.submit(probe_once, models[n], p): n for n, p in jobs}
+        for i, fut in enumerate(as_completed(futs), 1):
+            results[futs[fut]].append(fut.result())
+            if on_result: on_result(i, len(jobs))
+    return rank([summarize(n, r) for n, r in results.items()])
+
+
+# --- cache JSON ---
+def save_ranking(stats, path=RANKING_PATH, **config):
+    data = {"created_at": time.time(), "config": config, "models": stats}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return data
+
+
+def load_ranking(path=RANKING_PATH):
+    """Isi file ranking, atau None kalau belum ada / rusak."""
+    try:
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ranked_models(path=RANKING_PATH, max_age=RANKING_MAX_AGE):
+    """Nama model sehat urut tercepat; [] kalau ranking tidak ada atau sudah basi."""
+    data = load_ranking(path)
+    if not data or time.time() - data.get("created_at", 0) > max_age: return []
+    return [m["name"] for m in data.get("models", []) if m.get("healthy")]
+
+
+def ranking_stamp(path=RANKING_PATH):
+    """Berubah tiap kali file ranking ditulis ulang (untuk kunci cache)."""
+    try: return os.stat(path).st_mtime
+    except OSError: return None
+
+
+# --- fallback saat rate limit / model tidak cocok ---
+class FallbackModel:
+    """Seperti GenerativeModel: coba model sesuai urutan, lewati yang sedang kena rate limit atau hilang."""
+
+    def __init__(self, models):
+        self.models = list(models)  # [(nama, GenerativeModel)]
+        self.cooling = {}           # nama -> time.time() sampai boleh dipakai lagi
+        self.lock = threading.Lock()
+
+    @property
+    def names(self): return [n for n, _ in self.models]
+
+    def status(self):
+        """{nama: detik sisa cooldown} untuk model yang sedang dilewati."""
+        now = time.time()
+        with self.lock: return {n: int(t - now) + 1 for n, t in self.cooling.items() if t > now}
+
+    def _order(self):
+        now = time.time()
+        with self.lock: cool = {n for n, t in self.cooling.items() if t > now}
+        ready = [m for m in self.models if m[0] not in cool]
+        return ready + [m for m in self.models if m[0] in cool]  # semua cooldown -> tetap dicoba
+
+    def generate_content(self, *args, **kwargs):
+        """Error di model terakhir (atau error selain 429/503/400/404) diteruskan ke pemanggil."""
+        order = self._order()
+        for i, (name, model) in enumerate(order):
+            try:
+                return model.generate_content(*args, **kwargs)  # stream=True juga gagal di sini (chunk pertama diambil)
+            except Exception as e:
+                if not (is_rate_limited(e) or is_unsupported(e)) or i == len(order) - 1: raise
+                if getattr(e, "code", None) != 400:  # 400 khusus request ini; model tetap dipakai untuk yang lain
+                    with self.lock: self.cooling[name] = time.time() + FALLBACK_COOLDOWN
+                count("gemini.fallback")
@@ -0,0 +1,60 @@
+"""
+Skema tiap tab di spreadsheet productivity_db.
+
+Baris mentah dari Google Sheets (semua string) di-parse SEKALI per versi data menjadi dtype
+yang benar: datetime64 untuk tanggal, int64 untuk jumlah, category untuk kolom yang nilainya
+berulang. Frame hasilnya dipakai bersama oleh semua sesi, jadi perlakukan sebagai read-only:
+turunkan frame/series baru, jangan menambah atau mengubah kolom di tempat.
+"""
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)  # pandas 3 sudah selalu copy-on-write
+
+ID_COL = "ID"
+
+# key app -> nama tab di Sheets + kolom berurutan beserta tipenya
+SCHEMAS = {
+    "todo": {"title": "todos", "columns": {
+        "Tanggal": "datetime", "Task": "text", "Prioritas": "category", "Status": "category", ID_COL: "text"}},
+    "fin": {"title": "finance", "columns": {
+        "Tanggal": "datetime", "Item": "text", "Kategori": "category", "Jumlah": "int", "Tipe": "category", ID_COL: "text"}},
+    "habit": {"title": "habits", "columns": {
+        "Tanggal": "datetime", "Habit": "text", "Status": "category", ID_COL: "text"}},
+    "journal": {"title": "journal", "columns": {
+        "Tanggal": "datetime", "Isi_Jurnal": "text", "AI_Mood": "category", "AI_Saran": "text", ID_COL: "text"}},
+    "advisor": {"title": "advisor", "columns": {
+        "Timestamp": "datetime", "Pertanyaan": "text", "Jawaban": "text", ID_COL: "text"}},
+    "focus": {"title": "focus", "columns": {
+        "Tanggal": "datetime", "Menit": "int", ID_COL: "text"}},
+}
+
+
+def header_for(key):
+    return list(SCHEMAS[key]["columns"])
+
+
+def _parse_column(values, kind):
+    if kind == "datetime": return pd.to_datetime(values, errors="coerce", format="ISO8601")
+    if kind == "int": return pd.to_numeric(values, errors="coerce").fillna(0).round().astype("int64")
+    if kind == "category": return values.astype("category")
+    return values.astype(str)
+
+
+def parse_frame(key, header, rows):
+    """Baris mentah (list of list string) -> DataFrame bertipe sesuai SCHEMAS[key]."""
+    raw = pd.DataFrame(rows, columns=header, dtype=object)
+    types = SCHEMAS[key]["columns"]
+    return pd.DataFrame({col: _parse_column(raw[col], types.get(col, "text")) for col in header})
+
+
+def concat_frames(head, tail):
+    """Sambung frame hasil parse tanpa kehilangan dtype category (kategori digabung)."""
+    if head.empty: return tail.reset_index(drop=True)
+    if tail.empty: return head
+    out = pd.concat([head, tail], ignore_index=True)
+    for col in head.columns:
+        if isinstance(head[col].dtype, pd.CategoricalDtype):
+            out[col] = union_categoricals([head[col], tail[col]])
+    return out
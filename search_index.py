@@ -0,0 +1,92 @@
+"""
+Pencarian arsip (jurnal, Advisor) dengan inverted index BM25.
+
+Indeks hidup di memori dan diperbarui inkremental dari frame bertipe (lihat schema.py): `sync`
+hanya memeriksa baris sejak watermark yang diberikan pemanggil, dokumen ditambah/dihapus satu
+per satu tanpa rebuild. Modul ini tidak bergantung pada Streamlit.
+"""
+import heapq
+import math
+import re
+import threading
+
+import pandas as pd
+
+STOPWORDS = {"yang", "dan", "di", "ke", "dari", "ini", "itu", "aku", "saya", "untuk", "dengan", "atau", "juga",
+             "ada", "tidak", "akan", "sudah", "lagi", "jadi", "karena", "the", "and", "to", "of", "a"}
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", str(text).lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Inverted index BM25 sederhana; dokumen ditambah/dihapus satu per satu (tanpa rebuild)."""
+    K1, B = 1.5, 0.75
+
+    def __init__(self, fields, id_col):
+        self.fields = fields  # sheet -> (kolom tanggal, [kolom judul, kolom isi])
+        self.id_col = id_col
+        self.lock = threading.RLock()  # dipegang pemanggil selama ambil watermark + sync (lihat search_archive)
+        self.postings = {}   # term -> {doc_id: tf}
+        self.docs = {}       # doc_id -> {"len", "terms", "sig", "meta"}
+        self.total_len = 0
+        self.versions = {}   # sheet -> versi data terakhir yang sudah diindeks
+        self.order = {}      # sheet -> ID baris yang sudah diindeks, urut posisi di frame
+
+    def add(self, doc_id, text, meta, sig=None):
+        if doc_id in self.docs: self.remove(doc_id)
+        terms = tokenize(text); tf = {}
+        for t in terms: tf[t] = tf.get(t, 0) + 1
+        for t, n in tf.items(): self.postings.setdefault(t, {})[doc_id] = n
+        self.docs[doc_id] = {"len": len(terms), "terms": tf, "sig": sig, "meta": meta}
+        self.total_len += len(terms)
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if not doc: return
+        for t in doc["terms"]:
+            self.postings[t].pop(doc_id, None)
+            if not self.postings[t]: del self.postings[t]
+        self.total_len -= doc["len"]
+
+    def search(self, query, k=5, mode="similar", exclude=()):
+        """mode "keyword": semua kata harus ada; "similar": peringkat BM25 untuk kata mana pun."""
+        q = set(tokenize(query))
+        if not q or not self.docs: return []
+        with self.lock:
+            n, avg = len(self.docs), self.total_len / len(self.docs) or 1
+            scores = {}
+            for t in q:
+                post = self.postings.get(t, {})
+                idf = math.log(1 + (n - len(post) + 0.5) / (len(post) + 0.5))
+                for d, tf in post.items():
+                    norm = tf * (self.K1 + 1) / (tf + self.K1 * (1 - self.B + self.B * self.docs[d]["len"] / avg))
+                    scores[d] = scores.get(d, 0) + idf * norm
+            if mode == "keyword":
+                scores = {d: v for d, v in scores.items() if q <= self.docs[d]["terms"].keys()}
+            best = heapq.nlargest(k, ((v, d) for d, v in scores.items() if d not in exclude))
+            return [(v, self.docs[d]["meta"]) for v, d in best]
+
+    def sync(self, key, df, version, start=0):
+        """
+        Sinkronkan dengan frame versi `version`; hanya baris ke-`start` dst. (watermark dari get_frame)
+        yang diperiksa. ID yang hilang dari ekor itu dibuang, baris yang isinya berubah (hash kolom
+        teks, tervektor) diindeks ulang.
+        """
+        if self.versions.get(key) == version or df is None: return
+        date_col, fields = self.fields[key]
+        if not set(fields + [date_col, self.id_col]) <= set(df.columns): return
+        with self.lock:
+            old = self.order.get(key, [])
+            start = min(start, len(old), len(df))
+            tail = df.iloc[start:]
+            ids = tail[self.id_col].astype(str).tolist()
+            sigs = pd.util.hash_pandas_object(tail[fields], index=False).tolist()
+            for rid in set(old[start:]) - set(ids): self.remove(f"{key}:{rid}")
+            changed = [i for i, (rid, sig) in enumerate(zip(ids, sigs)) if self.docs.get(f"{key}:{rid}", {}).get("sig") != sig]
+            for i, row in zip(changed, tail[[date_col] + fields].iloc[changed].itertuples(index=False)):
+                self.add(f"{key}:{ids[i]}", " ".join(str(v) for v in row[1:]),
+                         {"sheet": key, "id": ids[i], "date": str(row[0])[:16], "title": str(row[1]), "body": str(row[2])}, sigs[i])
+            self.order[key] = old[:start] + ids
+            self.versions[key] = version
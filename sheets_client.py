@@ -0,0 +1,186 @@
+"""
+Pembungkus gspread yang sadar kuota.
+
+Semua request ke Google Sheets lewat satu `SheetsGateway` per proses:
+- token bucket terpisah untuk baca & tulis (kuota Sheets dihitung per menit),
+- retry dengan exponential backoff + jitter untuk 429 / 5xx / koneksi putus; tulis hanya diulang
+  kalau pasti belum diterapkan (429, atau koneksi gagal sebelum request terkirim), karena
+  append/deleteDimension yang diulang bisa menggandakan atau menghapus baris yang salah,
+- baca identik yang sedang berjalan (mis. dua sesi sync bersamaan) digabung jadi satu request,
+- setelah kuota benar-benar habis gateway masuk status "degraded" selama cooldown dan
+  langsung menolak request (QuotaExhausted) supaya tidak membakar kuota lebih jauh.
+Tiap request tercatat sebagai span `sheets.<method>` (lihat tracing.py).
+Worksheet/Spreadsheet asli dibungkus GuardedWorksheet/GuardedSpreadsheet; modul ini tidak bergantung
+pada Streamlit, instance gateway dibuat sekali lewat st.cache_resource.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import gspread
+import requests
+import urllib3
+
+from tracing import span, count
+
+READ_PER_MIN = 60      # kuota default Sheets API per user per menit
+WRITE_PER_MIN = 60
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0     # detik, dikali 2^percobaan
+BACKOFF_CAP = 16.0
+QUOTA_COOLDOWN = 60    # detik status degraded setelah retry 429 habis
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# method gspread yang dilewatkan lewat gateway; sisanya (title, id, ...) diteruskan apa adanya
+READ_METHODS = {"values_batch_get", "worksheets", "col_values", "get_all_values", "get_all_records", "row_values"}
+WRITE_METHODS = {"batch_update", "add_worksheet", "update", "append_row", "append_rows", "resize", "clear"}
+
+
+class QuotaExhausted(Exception):
+    """Kuota Sheets habis; data lokal terakhir tetap boleh ditampilkan."""
+
+
+class TokenBucket:
+    def __init__(self, per_min, burst=None):
+        self.rate = per_min / 60.0
+        self.capacity = burst or max(1, per_min // 6)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blok sampai ada token; mengembalikan lama menunggu (detik)."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                need = (1 - self.tokens) / self.rate
+            time.sleep(need); waited += need
+
+
+def status_of(exc):
+    if isinstance(exc, gspread.exceptions.APIError):
+        return getattr(exc.response, "status_code", None)
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return 503  # perlakukan seperti server sementara tidak tersedia
+    return None
+
+
+def sent_before_failure(exc):
+    """False kalau request pasti belum sampai ke Google (gagal connect / DNS); selain itu tidak bisa dipastikan."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout): return False
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = getattr(exc.args[0], "reason", exc.args[0]) if exc.args else None
+        return not isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return True
+
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try: return float(headers.get("Retry-After"))
+    except (TypeError, ValueError): return None
+
+
+class SheetsGateway:
+    def __init__(self, read_per_min=READ_PER_MIN, write_per_min=WRITE_PER_MIN):
+        self.buckets = {"read": TokenBucket(read_per_min), "write": TokenBucket(write_per_min)}
+        self.lock = threading.Lock()
+        self.inflight = {}  # kunci baca -> Future milik pemanggil pertama
+        self.degraded_until = 0.0
+        self.last_error = None
+        self.stats = {"calls": 0, "retries": 0, "coalesced": 0, "throttled_s": 0.0}
+
+    # --- status ---
+    def degraded(self):
+        """Info status degraded (dict) atau None kalau normal."""
+        left = self.degraded_until - time.time()
+        if left <= 0: return None
+        return {"retry_in": int(left) + 1, "error": self.last_error}
+
+    # --- eksekusi ---
+    def _execute(self, kind, fn, args, kwargs):
+        with span(f"sheets.{getattr(fn, '__name__', kind)}", "sheets") as meta:
+            return self._attempt(kind, fn, args, kwargs, meta)
+
+    def _attempt(self, kind, fn, args, kwargs, meta):
+        if self.degraded():
+            raise QuotaExhausted(f"Kuota Google Sheets habis, coba lagi {self.degraded()['retry_in']} detik lagi")
+        for attempt in range(MAX_RETRIES + 1):
+            waited = self.buckets[kind].acquire()
+            self.stats["throttled_s"] += waited
+            if waited: meta["throttled_ms"] = meta.get("throttled_ms", 0) + waited * 1000
+            self.stats["calls"] += 1
+            meta["attempts"] = attempt + 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                code = status_of(e)
+                if code not in RETRY_STATUS: raise
+                if kind == "write" and code != 429 and sent_before_failure(e): raise  # mungkin sudah diterapkan
+                self.last_error = f"HTTP {code}: {e}"
+                if attempt == MAX_RETRIES:
+                    if code == 429:
+                        self.degraded_until = time.time() + (_retry_after(e) or QUOTA_COOLDOWN)
+                        raise QuotaExhausted(f"Kuota Google Sheets habis ({self.last_error})") from e
+                    raise
+                self.stats["retries"] += 1
+                delay = _retry_after(e) or random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                time.sleep(min(delay, BACKOFF_CAP))
+
+    def read(self, key, fn, *args, **kwargs):
+        """Baca dengan single-flight: pemanggil lain dengan `key` sama menunggu hasil yang sama."""
+        with self.lock:
+            fut = self.inflight.get(key)
+            leader = fut is None
+            if leader: fut = self.inflight[key] = Future()
+            else: self.stats["coalesced"] += 1
+        if not leader:
+            count("sheets.coalesced")
+            return fut.result()
+        try:
+            fut.set_result(self._execute("read", fn, args, kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self.lock: self.inflight.pop(key, None)
+        return fut.result()
+
+    def write(self, fn, *args, **kwargs):
+        """Tanpa retry untuk kegagalan ambigu (timeout/5xx); pemanggil memverifikasi lalu mengulang sendiri."""
+        return self._execute("write", fn, args, kwargs)
+
+
+class _Guarded:
+    """Proxy tipis: method baca/tulis lewat gateway, atribut lain diteruskan ke objek asli."""
+
+    def __init__(self, target, gateway):
+        self._target, self._gw = target, gateway
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in READ_METHODS:
+            def call(*args, **kwargs):
+                key = (self._scope(), name, repr(args), repr(sorted(kwargs.items())))
+                return self._gw.read(key, attr, *args, **kwargs)
+            return call
+        if name in WRITE_METHODS:
+            return lambda *args, **kwargs: self._gw.write(attr, *args, **kwargs)
+        return attr
+
+
+class GuardedSpreadsheet(_Guarded):
+    def _scope(self): return ("spreadsheet", self._target.id)
+
+
+class GuardedWorksheet(_Guarded):
+    def _scope(self): return ("worksheet", self._target.id)
+
+    @property
+    def spreadsheet(self): return GuardedSpreadsheet(self._target.spreadsheet, self._gw)
@@ -0,0 +1,116 @@
+"""
+Tracing ringan per run Streamlit.
+
+Satu `Trace` per run (atau per fragment rerun) disimpan di contextvar, jadi sesi yang berjalan
+paralel tidak saling campur. Kode yang diukur cukup memakai `span(...)` / `@traced(...)` dan
+`count(...)`; di luar trace (mis. reconciler latar) keduanya no-op.
+Untuk ThreadPoolExecutor, bungkus fungsi dengan `bind(fn)` supaya span-nya masuk trace run ini.
+"""
+import contextvars
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+_trace = contextvars.ContextVar("trace", default=None)
+_depth = contextvars.ContextVar("trace_depth", default=0)
+
+
+class Trace:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.counters = Counter()
+        self.total_ms = None
+
+    def finish(self, interrupted=False):
+        """Tutup trace. `interrupted`: run berhenti di tengah (st.rerun/st.stop), total = akhir span terakhir."""
+        if self.total_ms is not None: return self
+        if interrupted:
+            self.label += " (terhenti)"
+            self.total_ms = max((s["at_ms"] + s["ms"] for s in self.spans), default=0.0)
+        else: self.total_ms = (time.perf_counter() - self.t0) * 1000
+        return self
+
+    def summary(self):
+        """Per nama span: jumlah panggilan, total & maksimum ms, plus token Gemini kalau ada."""
+        out = {}
+        for s in self.spans:
+            row = out.setdefault(s["name"], {"cat": s["cat"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["calls"] += 1; row["total_ms"] += s["ms"]; row["max_ms"] = max(row["max_ms"], s["ms"])
+            for k in ("prompt_tokens", "output_tokens"):
+                if k in s["meta"]: row[k] = row.get(k, 0) + (s["meta"][k] or 0)
+        return out
+
+    def to_dict(self):
+        return {"label": self.label, "started_at": self.started_at, "total_ms": self.total_ms,
+                "spans": self.spans, "counters": dict(self.counters)}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), default=str)
+
+
+def start(label):
+    """Mulai trace baru untuk konteks ini (trace lama, kalau ada, ditinggalkan)."""
+    t = Trace(label)
+    _trace.set(t); _depth.set(0)
+    return t
+
+
+def current():
+    return _trace.get()
+
+
+def detach():
+    """Lepas trace dari konteks ini dan kembalikan dalam keadaan selesai."""
+    t = _trace.get()
+    _trace.set(None)
+    return t.finish() if t else None
+
+
+@contextmanager
+def span(name, cat="app", **meta):
+    """Ukur blok kode; `meta` (dict) boleh diisi dari dalam blok, mis. jumlah token."""
+    t = _trace.get()
+    if t is None:
+        yield meta
+        return
+    depth = _depth.get(); token = _depth.set(depth + 1)
+    start_ = time.perf_counter()
+    rec = {"name": name, "cat": cat, "depth": depth, "at_ms": (start_ - t.t0) * 1000, "meta": meta}
+    try:
+        yield meta
+    except Exception as e:
+        meta["error"] = type(e).__name__
+        raise
+    finally:
+        rec["ms"] = (time.perf_counter() - start_) * 1000
+        _depth.reset(token)
+        t.spans.append(rec)
+
+
+def traced(name=None, cat="app"):
+    def deco(fn):
+        @wraps(fn)
+        def run(*args, **kwargs):
+            with span(name or fn.__name__, cat): return fn(*args, **kwargs)
+        return run
+    return deco
+
+
+def count(name, n=1):
+    t = _trace.get()
+    if t is not None: t.counters[name] += n
+
+
+def bind(fn):
+    """Bawa trace konteks ini ke thread lain (worker pool)."""
+    t = _trace.get()
+    def run(*args, **kwargs):
+        token = _trace.set(t)
+        try: return fn(*args, **kwargs)
+        finally: _trace.reset(token)
+    return run